@@ -855,7 +855,8 @@ async def _ensure_job_source_path(job_id: str) -> Path | None:
     if image_url:
         target = _generate_edit_path(".png")
         try:
-            download_file(image_url, target.as_posix())
+            # download_file синхронный (общий с RQ-воркерами) - выполняем вне event loop
+            await asyncio.to_thread(download_file, image_url, target.as_posix())
             return target
         except Exception as exc:  # noqa: BLE001
             logger.warning("Failed to download image {} for edit job {}: {}", image_url, job_id, exc)
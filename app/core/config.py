@@ -16,6 +16,9 @@ class Settings(BaseSettings):
     redis_url: str = "redis://redis:6379/0"  # В Docker используем имя сервиса 'redis' вместо 'localhost'
     fal_api_key: str
     fal_queue_base_url: str = "https://queue.fal.run"
+    # Публичный URL эндпоинта /webhooks/fal с секретом: https://host/webhooks/fal?token=<secret>
+    # (если задан, fal.ai сообщает о завершении задач; без token вебхуки отклоняются)
+    fal_webhook_url: str | None = None
     fal_standard_model: str = "fal-ai/flux-pro/v1.1-ultra"
     fal_premium_model: str = "fal-ai/nano-banana"
     fal_nano_banana_pro_model: str = "fal-ai/nano-banana-pro"
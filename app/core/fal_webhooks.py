@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import hmac
+import time
+from functools import lru_cache
+from urllib.parse import parse_qs, urlsplit
+
+from loguru import logger
+from redis.exceptions import RedisError
+
+from app.core import settings
+from app.core.redis import get_redis_connection
+
+# Сигнал о завершении задачи fal.ai (request_id), который пишет эндпоинт /webhooks/fal
+FAL_WEBHOOK_KEY_PREFIX = "fal:webhook:"
+FAL_WEBHOOK_TTL = 600  # Сигнал живет 10 минут, если воркер его так и не забрал
+# Секрет передается query-параметром в самом fal_webhook_url: https://host/webhooks/fal?token=<secret>
+FAL_WEBHOOK_TOKEN_PARAM = "token"
+
+
+@lru_cache
+def _expected_webhook_token() -> str | None:
+    if not settings.fal_webhook_url:
+        return None
+    values = parse_qs(urlsplit(settings.fal_webhook_url).query).get(FAL_WEBHOOK_TOKEN_PARAM)
+    return values[0] if values and values[0] else None
+
+
+def is_valid_webhook_token(token: str | None) -> bool:
+    """Проверяет секрет вебхука; без настроенного секрета вебхук не принимается вовсе."""
+    expected = _expected_webhook_token()
+    if expected is None or not token:
+        return False
+    return hmac.compare_digest(token.encode(), expected.encode())
+
+
+def signal_fal_completion(request_id: str) -> None:
+    """Сохраняет сигнал о завершении задачи fal.ai для ожидающего воркера."""
+    key = f"{FAL_WEBHOOK_KEY_PREFIX}{request_id}"
+    connection = get_redis_connection()
+    pipeline = connection.pipeline()
+    pipeline.lpush(key, b"1")
+    pipeline.expire(key, FAL_WEBHOOK_TTL)
+    pipeline.execute()
+
+
+def wait_for_fal_completion(request_id: str, timeout: float) -> bool:
+    """
+    Блокируется до сигнала о завершении задачи (True) или до истечения timeout (False).
+    BLPOP получает целые секунды (дробный таймаут требует Redis >= 6; 0 означал бы ожидание без ограничения),
+    поэтому паузы короче секунды - обычный sleep: сигнал останется в списке и будет получен следующим ожиданием.
+    При ошибке Redis (в т.ч. socket_timeout соединения короче блокировки) остаток паузы просто досыпается -
+    вызывающий код продолжает обычный опрос.
+    """
+    if timeout <= 0:
+        return False
+    if timeout < 1:
+        time.sleep(timeout)
+        return False
+    started = time.monotonic()
+    try:
+        return get_redis_connection().blpop([f"{FAL_WEBHOOK_KEY_PREFIX}{request_id}"], timeout=int(timeout)) is not None
+    except RedisError as exc:
+        logger.warning("Waiting for fal webhook {} failed, falling back to polling: {}", request_id, exc)
+        remaining = timeout - (time.monotonic() - started)
+        if remaining > 0:
+            time.sleep(remaining)
+        return False
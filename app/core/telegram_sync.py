@@ -2,6 +2,8 @@ from __future__ import annotations
 
 import json
 import threading
+from contextlib import nullcontext
+from pathlib import Path
 from typing import Any
 
 import requests
@@ -71,7 +73,7 @@ def send_message_sync(
 
 def send_document_sync(
     chat_id: int,
-    document: str | bytes,
+    document: str | bytes | Path,
     filename: str | None = None,
     caption: str | None = None,
     reply_to_message_id: int | None = None,
@@ -81,7 +83,7 @@ def send_document_sync(
     """Send document synchronously via Telegram Bot API.
     
     Args:
-        document: URL string or bytes content
+        document: URL string, bytes content or path to a local file (uploaded from an open file handle)
         filename: Required if document is bytes
     
     Returns:
@@ -105,15 +107,19 @@ def send_document_sync(
         payload["reply_markup"] = json.dumps(reply_markup)
     
     files = None
-    if isinstance(document, bytes):
+    if isinstance(document, (bytes, Path)):
         # Send as file upload
+        is_path = isinstance(document, Path)
         if not filename:
-            filename = "file.png"
-        files = {"document": (filename, document, "application/octet-stream")}
+            filename = document.name if is_path else "file.png"
         try:
+            size = document.stat().st_size if is_path else len(document)
             logger.info("Sending document to Telegram: chat_id={}, filename={}, size={} bytes, caption_length={}", 
-                       chat_id, filename, len(document), len(caption) if caption else 0)
-            response = session.post(url, data=payload, files=files, timeout=120.0)  # Увеличиваем таймаут до 2 минут
+                       chat_id, filename, size, len(caption) if caption else 0)
+            # Локальный файл передается открытым дескриптором, без предварительного read_bytes() в вызывающем коде
+            with (document.open("rb") if is_path else nullcontext(document)) as content:
+                files = {"document": (filename, content, "application/octet-stream")}
+                response = session.post(url, data=payload, files=files, timeout=120.0)  # Увеличиваем таймаут до 2 минут
             response.raise_for_status()
             result = response.json()
             if result.get("ok") and result.get("result"):
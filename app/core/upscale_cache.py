@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+import hashlib
+import json
+from pathlib import Path
+
+from app.core.redis import get_redis_connection
+
+# Результаты апскейла по содержимому исходника: повторная отправка того же изображения не идет в fal.ai
+UPSCALE_CACHE_KEY_PREFIX = "upscale:result:"
+UPSCALE_CACHE_TTL = 86400  # Сутки: дольше на доступность URL результата fal.media не полагаемся
+
+
+def upscale_cache_key(source_path: str | Path, model: str, scale: int) -> str:
+    """Ключ кэша: SHA-256 содержимого исходника + модель + масштаб (файл хэшируется потоково)."""
+    with open(source_path, "rb") as source:
+        digest = hashlib.file_digest(source, "sha256").hexdigest()
+    return f"{UPSCALE_CACHE_KEY_PREFIX}{digest}:{model}:{scale}"
+
+
+def get_cached_upscale(key: str) -> dict | None:
+    """Возвращает {"url", "filename"} сохраненного результата или None."""
+    raw = get_redis_connection().get(key)
+    if not raw:
+        return None
+    return json.loads(raw)
+
+
+def store_cached_upscale(key: str, url: str, filename: str | None) -> None:
+    """Сохраняет URL результата апскейла на UPSCALE_CACHE_TTL секунд."""
+    get_redis_connection().setex(key, UPSCALE_CACHE_TTL, json.dumps({"url": url, "filename": filename}))
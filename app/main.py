@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+from functools import lru_cache
+
 from aiogram.types import KeyboardButton, ReplyKeyboardMarkup
 
 from app.core.formats import FORMAT_ORDER, ImageFormat
@@ -60,7 +62,11 @@ IMAGE_FORMAT_VERTICAL_4_5 = "📱 4:5"
 IMAGE_FORMAT_VERTICAL_9_16 = "📹 9:16"
 IMAGE_FORMAT_HORIZONTAL_16_9 = "📺 16:9"
 
+# Раскладки статичны - каждая клавиатура строится один раз на процесс и переиспользуется
+# (возвращаемые объекты не изменяются вызывающим кодом)
+
 
+@lru_cache
 def build_main_keyboard() -> ReplyKeyboardMarkup:
     buttons = [
         [KeyboardButton(text=CREATE_BUTTON), KeyboardButton(text=PROMPT_WRITER_BUTTON)],
@@ -76,6 +82,7 @@ def build_main_keyboard() -> ReplyKeyboardMarkup:
     )
 
 
+@lru_cache
 def build_size_keyboard() -> ReplyKeyboardMarkup:
     """Клавиатура выбора формата (старая версия для обратной совместимости)."""
     buttons = [
@@ -93,6 +100,7 @@ def build_size_keyboard() -> ReplyKeyboardMarkup:
     )
 
 
+@lru_cache
 def build_format_keyboard() -> ReplyKeyboardMarkup:
     """Клавиатура выбора формата (новая единая система из 6 форматов).
     
@@ -126,6 +134,7 @@ def build_format_keyboard() -> ReplyKeyboardMarkup:
     )
 
 
+@lru_cache
 def build_edit_model_keyboard() -> ReplyKeyboardMarkup:
     buttons = [
         [KeyboardButton(text=IMAGE_EDIT_CHRONO_BUTTON), KeyboardButton(text=IMAGE_EDIT_SEDEDIT_BUTTON)],
@@ -139,6 +148,7 @@ def build_edit_model_keyboard() -> ReplyKeyboardMarkup:
     )
 
 
+@lru_cache
 def build_retoucher_mode_keyboard() -> ReplyKeyboardMarkup:
     buttons = [
         [KeyboardButton(text=RETOUCHER_SOFT_BUTTON), KeyboardButton(text=RETOUCHER_ENHANCE_BUTTON)],
@@ -151,6 +161,7 @@ def build_retoucher_mode_keyboard() -> ReplyKeyboardMarkup:
     )
 
 
+@lru_cache
 def build_retoucher_instruction_keyboard() -> ReplyKeyboardMarkup:
     buttons = [
         [KeyboardButton(text=RETOUCHER_SKIP_BUTTON)],
@@ -163,6 +174,7 @@ def build_retoucher_instruction_keyboard() -> ReplyKeyboardMarkup:
     )
 
 
+@lru_cache
 def build_quality_keyboard() -> ReplyKeyboardMarkup:
     """Клавиатура выбора качества для Nano Banana Pro edit."""
     buttons = [
@@ -179,6 +191,7 @@ def build_quality_keyboard() -> ReplyKeyboardMarkup:
     )
 
 
+@lru_cache
 def build_smart_merge_model_keyboard() -> ReplyKeyboardMarkup:
     """Клавиатура выбора модели для изменения изображений.
     
@@ -198,6 +211,7 @@ def build_smart_merge_model_keyboard() -> ReplyKeyboardMarkup:
     )
 
 
+@lru_cache
 def build_create_model_keyboard() -> ReplyKeyboardMarkup:
     """Клавиатура выбора модели после нажатия 'Создать'.
     
@@ -217,6 +231,7 @@ def build_create_model_keyboard() -> ReplyKeyboardMarkup:
     )
 
 
+@lru_cache
 def build_face_swap_model_keyboard() -> ReplyKeyboardMarkup:
     """Клавиатура выбора модели для замены лица."""
     buttons = [
@@ -235,6 +250,7 @@ HELP_AI_ASSISTANT_BUTTON = "🤖 ИИ-помощник"
 HELP_SUPPORT_BUTTON = "💬 Вопрос разработчикам"
 
 
+@lru_cache
 def build_help_keyboard() -> ReplyKeyboardMarkup:
     """Клавиатура меню помощи."""
     buttons = [
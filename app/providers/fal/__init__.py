@@ -1,6 +1,8 @@
 from app.providers.fal.images import (
     check_status as check_image_status,
+    check_status_async as check_image_status_async,
     resolve_result_asset as resolve_image_asset,
+    resolve_result_asset_to_path as resolve_image_asset_to_path,
     run_smart_merge,
     submit_smart_merge,
     submit_face_swap,
@@ -17,5 +19,7 @@ __all__ = [
     "submit_face_swap",
     "submit_image_upscale",
     "check_image_status",
+    "check_image_status_async",
     "resolve_image_asset",
+    "resolve_image_asset_to_path",
 ]
@@ -1,11 +1,18 @@
 from __future__ import annotations
 
+import asyncio
+import atexit
 import logging
+import os
+import random
 import time
 import threading
+from contextlib import asynccontextmanager
+from functools import lru_cache, wraps
+from types import MappingProxyType
+from typing import AsyncIterator, Callable, TypeVar
 
 import httpx
-import requests
 from loguru import logger
 
 from app.core.config import settings
@@ -15,12 +22,33 @@ DOWNLOAD_MAX_ATTEMPTS = 1  # Single attempt - if it fails, send by URL instead
 DOWNLOAD_CONNECT_TIMEOUT = 10.0  # Reasonable timeout for SSL handshake
 DOWNLOAD_READ_TIMEOUT = 300.0  # 5 minutes for large upscale files (15MB+)
 DOWNLOAD_RETRY_BACKOFF = 1.5
+DOWNLOAD_PROGRESS_STEP = 4 * 1024 * 1024  # Прогресс скачивания в логах каждые ~4MB
+# Браузерный User-Agent для скачивания с CDN (часть CDN отклоняет/ограничивает запросы без него)
+_DOWNLOAD_HEADERS = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"}
 RUN_BASE_URL = "https://fal.run"
 RUN_CONNECT_TIMEOUT = 10.0
 RUN_READ_TIMEOUT = 150.0
 RUN_WRITE_TIMEOUT = 60.0
 RUN_MAX_ATTEMPTS = 3
 RUN_RETRY_BACKOFF = 2.0
+RETRY_MAX_BACKOFF = 30.0
+# 429 - запрос не принят (rate limit), повтор безопасен; 5xx на submit/run здесь не повторяем -
+# задача могла быть создана (повторную отправку с учетом этого делают воркеры)
+RATE_LIMIT_STATUS = 429
+QUEUE_SUBMIT_MAX_ATTEMPTS = 3
+QUEUE_SUBMIT_RETRY_BACKOFF = 2.0
+QUEUE_RESULT_MAX_ATTEMPTS = 3
+QUEUE_RESULT_RETRY_BACKOFF = 1.0
+# Ошибки получения результата, которые могут быть временными (в т.ч. 401 сразу после завершения задачи)
+QUEUE_RESULT_RETRYABLE_STATUSES = frozenset({500, 502, 503, 401})
+_QUEUE_TIMEOUT = httpx.Timeout(
+    connect=30.0,  # Increased for SSL handshake
+    read=60.0,
+    write=30.0,
+    pool=30.0,
+)
+
+T = TypeVar("T")
 
 # Global HTTP client with connection pooling for better performance
 _http_client_lock = threading.Lock()
@@ -34,7 +62,7 @@ _http_client_timeout = httpx.Timeout(
 _http_client_limits = httpx.Limits(
     max_keepalive_connections=20,
     max_connections=100,
-    keepalive_expiry=30.0,
+    keepalive_expiry=75.0,  # Совпадает с nginx keepalive_timeout у fal: опрос раз в 2-10 с держит тот же сокет
 )
 
 
@@ -61,6 +89,72 @@ def _close_http_client() -> None:
                 _http_client = None
 
 
+atexit.register(_close_http_client)
+
+
+# Async HTTP client for status polling (httpx.AsyncClient is bound to the event loop it was created in).
+# Клиент живет только внутри async_http_client_scope: закрытый вместе с циклом asyncio.run клиент
+# уже нельзя закрыть из следующего цикла, поэтому неявное создание "на лету" привело бы к утечке пула.
+_async_http_client: httpx.AsyncClient | None = None
+_async_http_client_loop: asyncio.AbstractEventLoop | None = None
+
+
+@asynccontextmanager
+async def async_http_client_scope() -> AsyncIterator[httpx.AsyncClient]:
+    """Открывает async-клиент для текущего event loop и гарантированно закрывает его на выходе."""
+    global _async_http_client, _async_http_client_loop
+    async with httpx.AsyncClient(timeout=_http_client_timeout, limits=_http_client_limits) as client:
+        previous = _async_http_client, _async_http_client_loop
+        _async_http_client, _async_http_client_loop = client, asyncio.get_running_loop()
+        try:
+            yield client
+        finally:
+            _async_http_client, _async_http_client_loop = previous
+
+
+def _get_async_http_client() -> httpx.AsyncClient:
+    """Async HTTP client of the enclosing async_http_client_scope for the running event loop."""
+    if _async_http_client is None or _async_http_client_loop is not asyncio.get_running_loop():
+        raise RuntimeError("Async fal client is only available inside async_http_client_scope()")
+    return _async_http_client
+
+
+def _reset_http_clients_after_fork() -> None:
+    """RQ форкает work horse на каждую задачу: сокеты/TLS-сессии пула родителя в потомке не используем."""
+    global _http_client, _http_client_lock, _async_http_client, _async_http_client_loop
+    _http_client = None
+    _http_client_lock = threading.Lock()
+    _async_http_client = None
+    _async_http_client_loop = None
+
+
+os.register_at_fork(after_in_child=_reset_http_clients_after_fork)
+
+
+# CDN, с которого отдаются результаты (очередь берется из settings.fal_queue_base_url)
+WARMUP_HOSTS = ("https://fal.media",)
+WARMUP_TIMEOUT = 5.0
+
+
+def prewarm_http_client() -> threading.Thread:
+    """
+    В фоне открывает keep-alive соединения (DNS + TCP + TLS) к очереди fal.ai и CDN результатов,
+    пока задача готовит запрос, - первый submit/poll идет по уже установленному соединению.
+    """
+    def _warm() -> None:
+        client = _get_http_client()
+        for base_url in (settings.fal_queue_base_url, *WARMUP_HOSTS):
+            try:
+                client.head(f"{base_url.rstrip('/')}/", timeout=WARMUP_TIMEOUT)
+            except httpx.HTTPError as exc:
+                logger.debug("HTTP prewarm for {} failed: {}", base_url, exc)
+
+    thread = threading.Thread(target=_warm, name="fal-prewarm", daemon=True)
+    thread.start()
+    return thread
+
+
+@lru_cache
 def _normalize_path(path: str) -> str:
     return path.strip("/")
 
@@ -90,7 +184,12 @@ for override_candidate in (
         if normalized_candidate.startswith("fal-ai/recraft/upscale/") or normalized_candidate.startswith("fal-ai/esrgan"):
             QUEUE_BASE_OVERRIDES[normalized_candidate] = normalized_candidate
 
+# После заполнения словарь только читается - замораживаем, чтобы кэш _base_model_path не мог устареть
+QUEUE_BASE_OVERRIDES = MappingProxyType(dict(QUEUE_BASE_OVERRIDES))
 
+
+# Набор моделей мал, а путь пересчитывается на каждом опросе статуса - кэшируем.
+@lru_cache
 def _base_model_path(model: str) -> str:
     normalized = _normalize_path(model)
     override = QUEUE_BASE_OVERRIDES.get(normalized)
@@ -102,65 +201,135 @@ def _base_model_path(model: str) -> str:
     return normalized
 
 
+# Ключ API не меняется за время жизни процесса (reload_settings не затрагивает объект settings этого модуля),
+# поэтому заголовки собираются один раз; возвращаемые словари общие - вызывающий код их не изменяет
+_HEADERS_NO_CONTENT_TYPE = {"Authorization": f"Key {settings.fal_api_key}"}
+_HEADERS_JSON = {**_HEADERS_NO_CONTENT_TYPE, "Content-Type": "application/json"}
+
+
 def _get_headers(content_type: bool = True) -> dict[str, str]:
-    headers = {"Authorization": f"Key {settings.fal_api_key}"}
-    if content_type:
-        headers["Content-Type"] = "application/json"
-    return headers
+    return _HEADERS_JSON if content_type else _HEADERS_NO_CONTENT_TYPE
+
+
+# Тело ответа в логе обрезается: результат fal может быть многомегабайтным словарем
+LOG_RESPONSE_MAX_CHARS = 500
 
 
 def _log_request(method: str, url: str, payload: dict | None) -> None:
-    logger.debug("fal request: {} {} payload={}", method, url, payload)
+    # lazy: repr payload строится только если DEBUG реально пишется
+    logger.opt(lazy=True).debug("fal request: {} {} payload={}", lambda: method, lambda: url, lambda: payload)
 
 
 def _log_response(url: str, status: int, data: dict | str) -> None:
-    logger.debug("fal response: {} {} -> {}", url, status, data)
+    logger.opt(lazy=True).debug(
+        "fal response: {} {} -> {}",
+        lambda: url,
+        lambda: status,
+        lambda: str(data)[:LOG_RESPONSE_MAX_CHARS],
+    )
+
+
+def _retry_delay(attempt: int, base: float) -> float:
+    """Full jitter: случайная пауза в [0, min(RETRY_MAX_BACKOFF, base * 2^attempt)] - воркеры не ретраят синхронно."""
+    return random.uniform(0, min(RETRY_MAX_BACKOFF, base * 2 ** attempt))
 
 
-def queue_submit(model: str, payload: dict) -> dict:
+def _is_fal_retryable(response: httpx.Response) -> bool:
+    """fal.ai явно помечает неповторяемые ошибки заголовком X-Fal-Retryable: false."""
+    return response.headers.get("X-Fal-Retryable", "").lower() != "false"
+
+
+def _retry_http(
+    *,
+    attempts: int,
+    base_backoff: float,
+    retry_exc: tuple[type[Exception], ...],
+    retry_statuses: frozenset[int] = frozenset({RATE_LIMIT_STATUS}),
+) -> Callable[[Callable[..., T]], Callable[..., T]]:
+    """
+    Единая политика повторов запросов к fal.ai: повторяются исключения retry_exc и HTTP-ответы
+    с кодом из retry_statuses (если fal не пометил их X-Fal-Retryable: false), пауза - full jitter.
+    После последней попытки исходная ошибка пробрасывается вызывающему коду.
+    """
+    def decorator(func: Callable[..., T]) -> Callable[..., T]:
+        @wraps(func)
+        def wrapper(*args, **kwargs) -> T:
+            for attempt in range(attempts):
+                last_attempt = attempt >= attempts - 1
+                try:
+                    return func(*args, **kwargs)
+                except httpx.HTTPStatusError as exc:
+                    if last_attempt or exc.response.status_code not in retry_statuses or not _is_fal_retryable(exc.response):
+                        raise
+                    reason = f"HTTP {exc.response.status_code}"
+                except retry_exc as exc:
+                    if last_attempt:
+                        raise
+                    reason = str(exc) or type(exc).__name__
+                delay = _retry_delay(attempt, base_backoff)
+                logger.warning("{} attempt {}/{} failed: {}. Retrying in {:.1f}s",
+                               func.__name__, attempt + 1, attempts, reason, delay)
+                time.sleep(delay)
+            raise RuntimeError(f"{func.__name__}: no attempts made")
+        return wrapper
+    return decorator
+
+
+def _post_json(url: str, payload: dict, timeout: httpx.Timeout, params: dict | None = None) -> dict:
+    """Одна попытка POST к fal.ai через общий пул соединений; ошибки HTTP пробрасываются как HTTPStatusError."""
+    client = _get_http_client()
+    response = client.post(url, json=payload, params=params, headers=_get_headers(), timeout=timeout)
+    if response.is_error:
+        _log_response(url, response.status_code, response.text)
+        response.raise_for_status()
+    data = response.json()
+    _log_response(url, response.status_code, data)
+    return data
+
+
+# 5xx на submit/run не повторяем: задача могла быть создана; повтор отправки делают воркеры
+@_retry_http(
+    attempts=QUEUE_SUBMIT_MAX_ATTEMPTS,
+    base_backoff=QUEUE_SUBMIT_RETRY_BACKOFF,
+    retry_exc=(httpx.ConnectTimeout, httpx.ReadTimeout),
+)
+def _queue_submit_post(url: str, payload: dict, params: dict | None) -> dict:
+    return _post_json(url, payload, _QUEUE_TIMEOUT, params=params)
+
+
+@_retry_http(
+    attempts=RUN_MAX_ATTEMPTS,
+    base_backoff=RUN_RETRY_BACKOFF,
+    retry_exc=(httpx.TimeoutException, httpx.RemoteProtocolError, ValueError),
+)
+def _run_model_post(url: str, payload: dict, timeout: httpx.Timeout) -> dict:
+    return _post_json(url, payload, timeout)
+
+
+@_retry_http(
+    attempts=QUEUE_RESULT_MAX_ATTEMPTS,
+    base_backoff=QUEUE_RESULT_RETRY_BACKOFF,
+    retry_exc=(httpx.RequestError, ValueError),
+    retry_statuses=QUEUE_RESULT_RETRYABLE_STATUSES,
+)
+def _queue_result_post(url: str, payload: dict) -> dict:
+    return _post_json(url, payload, _QUEUE_TIMEOUT)
+
+
+def queue_submit(model: str, payload: dict, *, webhook: bool = False) -> dict:
     url = _build_queue_url(model)
     _log_request("POST", url, payload)
     
-    # Use custom timeout for queue submissions with longer connect timeout for SSL
-    queue_timeout = httpx.Timeout(
-        connect=30.0,  # Increased for SSL handshake
-        read=60.0,
-        write=30.0,
-        pool=30.0,
-    )
-    
-    last_error: Exception | None = None
-    max_attempts = 3
-    for attempt in range(max_attempts):
-        try:
-            client = _get_http_client()
-            response = client.post(url, json=payload, headers=_get_headers(), timeout=queue_timeout)
-            if response.is_error:
-                _log_response(url, response.status_code, response.text)
-                response.raise_for_status()
-            data = response.json()
-            _log_response(url, response.status_code, data)
-            return data
-        except (httpx.ConnectTimeout, httpx.ReadTimeout) as e:
-            last_error = e
-            if attempt < max_attempts - 1:
-                wait_time = 2.0 * (attempt + 1)
-                logger.warning(
-                    "Queue submit attempt {}/{} failed with timeout: {}. Retrying in {:.1f}s",
-                    attempt + 1, max_attempts, e, wait_time
-                )
-                time.sleep(wait_time)
-                continue
-            raise
-        except Exception as e:
-            # For other errors, don't retry
-            _log_response(url, 0, str(e))
-            raise
-    
-    # Should not reach here, but just in case
-    if last_error:
-        raise last_error
-    raise RuntimeError("Queue submit failed after retries")
+    # webhook=True только для задач, чей опрос ждет сигнала: fal.ai вызовет webhook по завершении задачи,
+    # и воркер просыпается сразу, не дожидаясь следующего опроса
+    params = {"fal_webhook": settings.fal_webhook_url} if webhook and settings.fal_webhook_url else None
+    try:
+        return _queue_submit_post(url, payload, params)
+    except httpx.HTTPStatusError:
+        raise
+    except Exception as e:
+        _log_response(url, 0, str(e))
+        raise
 
 
 def run_model(model: str, payload: dict) -> dict:
@@ -173,38 +342,7 @@ def run_model(model: str, payload: dict) -> dict:
         write=RUN_WRITE_TIMEOUT,
         pool=30.0,
     )
-    last_error: Exception | None = None
-    for attempt in range(RUN_MAX_ATTEMPTS):
-        try:
-            # Use global client for connection pooling, but with custom timeout
-            client = _get_http_client()
-            response = client.post(url, json=payload, headers=_get_headers(), timeout=timeout)
-            if response.is_error:
-                _log_response(url, response.status_code, response.text)
-                response.raise_for_status()
-            data = response.json()
-            _log_response(url, response.status_code, data)
-            return data
-        except (httpx.TimeoutException, httpx.ReadTimeout, httpx.RemoteProtocolError) as exc:
-            last_error = exc
-            logger.warning(
-                "Attempt {}: run_model {} timed out: {}",
-                attempt + 1,
-                model,
-                exc,
-            )
-            if attempt < RUN_MAX_ATTEMPTS - 1:
-                time.sleep(RUN_RETRY_BACKOFF * (attempt + 1))
-        except httpx.HTTPError:
-            raise
-        except Exception as exc:  # noqa: BLE001
-            last_error = exc
-            logger.warning("Attempt {}: run_model {} failed: {}", attempt + 1, model, exc)
-            if attempt < RUN_MAX_ATTEMPTS - 1:
-                time.sleep(RUN_RETRY_BACKOFF * (attempt + 1))
-    if last_error:
-        raise last_error
-    raise RuntimeError("run_model failed without explicit error")
+    return _run_model_post(url, payload, timeout)
 
 
 def queue_get(url: str) -> dict:
@@ -219,6 +357,18 @@ def queue_get(url: str) -> dict:
     return data
 
 
+async def queue_get_async(url: str) -> dict:
+    _log_request("GET", url, None)
+    client = _get_async_http_client()
+    response = await client.get(url, headers=_get_headers(content_type=False))
+    if response.is_error:
+        _log_response(url, response.status_code, response.text)
+        response.raise_for_status()
+    data = response.json()
+    _log_response(url, response.status_code, data)
+    return data
+
+
 def queue_status(model: str, request_id: str) -> dict:
     base_model = _base_model_path(model)
     url = _build_queue_url(base_model, f"requests/{request_id}/status")
@@ -236,6 +386,35 @@ def queue_status(model: str, request_id: str) -> dict:
         raise
 
 
+async def queue_status_async(model: str, request_id: str) -> dict:
+    base_model = _base_model_path(model)
+    url = _build_queue_url(base_model, f"requests/{request_id}/status")
+    logger.debug("📡 API REQUEST: queue_status (async) GET {} (request_id: {})", url, request_id[:8])
+    try:
+        return await queue_get_async(url)
+    except httpx.HTTPStatusError as exc:
+        normalized = _normalize_path(model)
+        if exc.response.status_code == 404 and base_model != normalized:
+            fallback_url = _build_queue_url(normalized, f"requests/{request_id}/status")
+            logger.debug("📡 API REQUEST: queue_status (async) fallback GET {} (request_id: {})", fallback_url, request_id[:8])
+            return await queue_get_async(fallback_url)
+        raise
+
+
+@lru_cache
+def _queue_result_templates(model: str) -> tuple[tuple[str, str], ...]:
+    """Пары (путь модели, шаблон суффикса) для кандидатов queue_result в порядке перебора; request_id подставляется при вызове."""
+    normalized = _normalize_path(model)
+    base_model = _base_model_path(model)
+    templates = [(base_model, "requests/{}")]
+    if base_model != normalized:
+        templates.append((normalized, "requests/{}"))
+    templates += [(base_model, "requests/{}/response"), (base_model, "requests/{}/result")]
+    if base_model != normalized:
+        templates += [(normalized, "requests/{}/response"), (normalized, "requests/{}/result")]
+    return tuple(templates)
+
+
 def queue_result(model: str, request_id: str) -> dict:
     """
     Get result from fal.ai queue API.
@@ -257,83 +436,22 @@ def queue_result(model: str, request_id: str) -> dict:
         payload = {"requestId": request_id}
         _log_request("POST", url, payload)
         
-        max_retries = 3
-        retry_delay = 1.0
-        last_error: Exception | None = None
-        
-        for attempt in range(max_retries):
-            try:
-                client = _get_http_client()
-                queue_timeout = httpx.Timeout(
-                    connect=30.0,
-                    read=60.0,
-                    write=30.0,
-                    pool=30.0,
-                )
-                response = client.post(url, json=payload, headers=_get_headers(), timeout=queue_timeout)
-                if response.is_error:
-                    _log_response(url, response.status_code, response.text)
-                    response.raise_for_status()
-                data = response.json()
-                _log_response(url, response.status_code, data)
-                logger.debug("queue_result {} succeeded for seedream on attempt {}", request_id, attempt + 1)
-                return data
-            except httpx.HTTPStatusError as exc:
-                last_error = exc
-                status_code = exc.response.status_code
-                response_text = exc.response.text[:200] if hasattr(exc.response, 'text') else str(exc)
-                retryable_header = exc.response.headers.get("X-Fal-Retryable", "not set")
-                logger.debug("queue_result {} -> {} {} (X-Fal-Retryable: {})", 
-                            url, status_code, response_text, retryable_header)
-                
-                # Retry on server errors (500, 502, 503) and auth errors (401)
-                if status_code in (500, 502, 503, 401) and attempt < max_retries - 1:
-                    logger.warning(
-                        "queue_result {} attempt {} failed with {}: {} (X-Fal-Retryable: {}). Retrying in {:.1f}s",
-                        request_id,
-                        attempt + 1,
-                        status_code,
-                        response_text,
-                        retryable_header,
-                        retry_delay,
-                    )
-                    time.sleep(retry_delay)
-                    retry_delay *= 2
-                    continue
-                else:
-                    logger.error("queue_result {} failed after {} attempts with {}: {} (X-Fal-Retryable: {})", 
-                                request_id, max_retries, status_code, response_text, retryable_header)
-                    raise
-            except Exception as exc:  # noqa: BLE001
-                last_error = exc
-                if attempt < max_retries - 1:
-                    logger.warning("queue_result {} attempt {} failed: {}. Retrying in {:.1f}s", 
-                                  request_id, attempt + 1, exc, retry_delay)
-                    time.sleep(retry_delay)
-                    retry_delay *= 2
-                    continue
-                raise
-        
-        if last_error:
-            raise last_error
-        raise RuntimeError("queue_result failed without HTTP error")
+        try:
+            return _queue_result_post(url, payload)
+        except httpx.HTTPStatusError as exc:
+            logger.error("queue_result {} failed with {}: {} (X-Fal-Retryable: {})",
+                         request_id, exc.response.status_code, exc.response.text[:200],
+                         exc.response.headers.get("X-Fal-Retryable", "not set"))
+            raise
     
     # For non-Seedream models, use GET requests to various endpoints (original logic)
-    base_model = _base_model_path(model)
-    candidate_paths: list[str] = [
-        _build_queue_url(base_model, f"requests/{request_id}"),
+    candidate_paths = [
+        _build_queue_url(model_path, suffix.format(request_id))
+        for model_path, suffix in _queue_result_templates(model)
     ]
-    if base_model != normalized:
-        candidate_paths.append(_build_queue_url(normalized, f"requests/{request_id}"))
-    candidate_paths.append(_build_queue_url(base_model, f"requests/{request_id}/response"))
-    candidate_paths.append(_build_queue_url(base_model, f"requests/{request_id}/result"))
-    if base_model != normalized:
-        candidate_paths.append(_build_queue_url(normalized, f"requests/{request_id}/response"))
-        candidate_paths.append(_build_queue_url(normalized, f"requests/{request_id}/result"))
 
     # Retry logic for server errors (500, 502, 503)
     max_retries = 3
-    retry_delay = 1.0
     last_error: httpx.HTTPStatusError | None = None
     
     for attempt in range(max_retries):
@@ -355,7 +473,8 @@ def queue_result(model: str, request_id: str) -> dict:
                 
                 # Retry on server errors (500, 502, 503) and auth errors (401) - may be temporary
                 if status_code in (500, 502, 503, 401):
-                    if attempt < max_retries - 1:
+                    if attempt < max_retries - 1 and _is_fal_retryable(exc.response):
+                        retry_delay = _retry_delay(attempt, 1.0)
                         logger.warning(
                             "queue_result {} attempt {} failed with {}: {} (X-Fal-Retryable: {}). Retrying all candidates in {:.1f}s",
                             request_id,
@@ -366,7 +485,6 @@ def queue_result(model: str, request_id: str) -> dict:
                             retry_delay,
                         )
                         time.sleep(retry_delay)
-                        retry_delay *= 2
                         break  # Retry from first candidate
                     else:
                         # Last attempt failed, raise with detailed error
@@ -392,67 +510,52 @@ def queue_result(model: str, request_id: str) -> dict:
 
 
 def download_file(url: str, target_path: str) -> None:
-    import time as time_module
-    start_time = time_module.time()
+    start_time = time.time()
     logger.info("📥 DOWNLOAD START: {} -> {}", url[:80], target_path)
+    # Общий keep-alive клиент: TLS-сессия к fal.media переиспользуется между скачиваниями
+    client = _get_http_client()
+    download_timeout = httpx.Timeout(
+        connect=DOWNLOAD_CONNECT_TIMEOUT,
+        read=DOWNLOAD_READ_TIMEOUT,
+        write=DOWNLOAD_CONNECT_TIMEOUT,
+        pool=DOWNLOAD_CONNECT_TIMEOUT,
+    )
     last_error: Exception | None = None
     for attempt in range(DOWNLOAD_MAX_ATTEMPTS):
         try:
-            attempt_start = time_module.time()
+            attempt_start = time.time()
             logger.info("📥 DOWNLOAD attempt {}/{}: connecting to {} (timeout: connect={}s, read={}s)", 
                        attempt + 1, DOWNLOAD_MAX_ATTEMPTS, url[:80], DOWNLOAD_CONNECT_TIMEOUT, DOWNLOAD_READ_TIMEOUT)
-            
-            # Use requests with proper SSL configuration
-            # Disable SSL verification warnings but keep verification enabled
-            import urllib3
-            urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
-            
-            session = requests.Session()
-            session.headers.update({
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-                'Connection': 'keep-alive'
-            })
-            
-            # Use tuple (connect_timeout, read_timeout) for requests
-            timeout_tuple = (DOWNLOAD_CONNECT_TIMEOUT, DOWNLOAD_READ_TIMEOUT)
-            
-            request_start = time_module.time()
-            
-            # Skip HEAD request to speed up download - go straight to GET
-            # Use streaming download with larger chunk size for better performance
-            logger.info("📥 DOWNLOAD attempt {}: starting streaming download...", attempt + 1)
-            response = session.get(url, stream=True, timeout=timeout_tuple, allow_redirects=True)
-            response.raise_for_status()
-            
-            # Try to get file size from Content-Length header (if available)
-            content_length_header = response.headers.get("content-length")
-            if content_length_header:
-                file_size_mb = int(content_length_header) / (1024 * 1024)
-                logger.info("📥 DOWNLOAD attempt {}: file size detected = {:.2f} MB", 
-                           attempt + 1, file_size_mb)
-            
-            # Use larger chunk size (64KB instead of 8KB) for faster download
-            chunk_size = 65536  # 64KB chunks for better performance
-            content_length_downloaded = 0
-            chunk_count = 0
-            with open(target_path, "wb") as file:
-                for chunk in response.iter_content(chunk_size=chunk_size):
-                    if chunk:
+            with client.stream(
+                "GET", url, headers=_DOWNLOAD_HEADERS, timeout=download_timeout, follow_redirects=True
+            ) as response:
+                response.raise_for_status()
+
+                # Try to get file size from Content-Length header (if available)
+                content_length_header = response.headers.get("content-length")
+                if content_length_header:
+                    file_size_mb = int(content_length_header) / (1024 * 1024)
+                    logger.info("📥 DOWNLOAD attempt {}: file size detected = {:.2f} MB", 
+                               attempt + 1, file_size_mb)
+
+                # Чанки пишутся в том виде, в каком их отдает декодер httpx: без chunk_size нет
+                # промежуточной пересборки буфера (лишнего копирования каждого байта)
+                content_length_downloaded = 0
+                next_progress = DOWNLOAD_PROGRESS_STEP
+                with open(target_path, "wb") as file:
+                    for chunk in response.iter_bytes():
                         file.write(chunk)
                         content_length_downloaded += len(chunk)
-                        chunk_count += 1
-                        # Логируем прогресс каждые 50 чанков (примерно каждые 3.2MB)
-                        if chunk_count % 50 == 0:
-                            downloaded_mb = content_length_downloaded / (1024 * 1024)
-                            logger.info("📥 DOWNLOAD progress: {:.2f} MB downloaded...", downloaded_mb)
-            
-            content_size = content_length_downloaded
-            total_time = time_module.time() - attempt_start
+                        if content_length_downloaded >= next_progress:
+                            logger.info("📥 DOWNLOAD progress: {:.2f} MB downloaded...",
+                                        content_length_downloaded / (1024 * 1024))
+                            next_progress += DOWNLOAD_PROGRESS_STEP
+
+            total_time = time.time() - attempt_start
             logger.info("✅ DOWNLOAD COMPLETE: {} bytes ({:.2f} MB) saved to {} in {:.2f}s", 
-                       content_size, content_size / (1024 * 1024), target_path, total_time)
-            session.close()
+                       content_length_downloaded, content_length_downloaded / (1024 * 1024), target_path, total_time)
             return
-        except (requests.exceptions.Timeout, requests.exceptions.ConnectionError, requests.exceptions.SSLError) as exc:
+        except httpx.RequestError as exc:
             last_error = exc
             logger.warning(
                 "❌ DOWNLOAD attempt {} FAILED: {} -> {}",
@@ -472,5 +575,5 @@ def download_file(url: str, target_path: str) -> None:
                 logger.debug("Waiting {} seconds before retry...", sleep_time)
                 time.sleep(sleep_time)
     if last_error:
-        logger.error("All download attempts failed for {}: {}", url, last_error)
+        logger.error("All download attempts failed for {} after {:.2f}s: {}", url, time.time() - start_time, last_error)
         raise last_error
@@ -7,6 +7,7 @@ import mimetypes
 import os
 import tempfile
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Any, Dict, NamedTuple
 from urllib.parse import urlparse
@@ -17,7 +18,16 @@ import httpx
 from PIL import Image
 
 from app.core.config import settings, reload_settings
-from app.providers.fal.client import queue_get, queue_result, queue_status, queue_submit, run_model
+from app.providers.fal.client import (
+    _get_http_client,
+    queue_get,
+    queue_get_async,
+    queue_result,
+    queue_status,
+    queue_status_async,
+    queue_submit,
+    run_model,
+)
 from app.providers.fal.models_map import (
     apply_model_defaults,
     get_image_model,
@@ -298,8 +308,24 @@ def _ensure_png_data_url(image_path: str | None = None, image_url: str | None =
     except Exception as exc:  # noqa: BLE001
         raise RuntimeError(f"Failed to download image from {image_url}") from exc
 
+
+def _ensure_upscale_png_data_url(image_path: str | None = None, image_url: str | None = None) -> str:
+    """Как _ensure_png_data_url, но готовый RGB PNG с диска (вход, подготовленный воркером) кодируется без пересжатия."""
+    if not image_path:
+        return _ensure_png_data_url(image_url=image_url)
+    with open(image_path, "rb") as file:
+        data = file.read()
+    with Image.open(io.BytesIO(data)) as img:
+        is_rgb_png = img.format == "PNG" and img.mode == "RGB"
+    if not is_rgb_png:
+        return _encode_bytes_to_png_data_url(data)
+    encoded = base64.b64encode(data).decode("ascii")
+    return f"data:image/png;base64,{encoded}"
+
 _MEMORY_PROTOCOL = "memory://"
 _CACHE_TTL_SECONDS = 600
+_TERMINAL_STATUSES = frozenset({"succeeded", "failed"})
+_STREAM_CHUNK_SIZE = 65536  # 64KB chunks для потокового сохранения результата
 _TASK_CACHE: Dict[str, Dict[str, Any]] = {}
 
 
@@ -318,6 +344,18 @@ def _purge_cache() -> None:
         _TASK_CACHE.pop(key, None)
 
 
+def _cached_status(entry: dict[str, Any]) -> dict[str, Any] | None:
+    """Return the last status snapshot if it is terminal; in-progress states are always re-checked."""
+    status = entry.get("status")
+    if status not in _TERMINAL_STATUSES:
+        return None
+    return {
+        "status": status,
+        "result_url": entry.get("result_url") if status == "succeeded" else None,
+        "error": entry.get("error"),
+    }
+
+
 def _parse_size(size: str | None) -> dict[str, Any]:
     if not size:
         return {}
@@ -530,7 +568,7 @@ def _encode_file_to_data_url(file_path: str | Path, compress_if_needed: bool = T
                 logger.warning("Failed to delete temporary compressed file {}: {}", compressed_path, exc)
 
 
-def submit_image(prompt: str, **opts: Any) -> str:
+def submit_image(prompt: str, *, webhook: bool = False, **opts: Any) -> str:
     _purge_cache()
     preset = opts.pop("preset", None)
     requested_model = opts.pop("model", None)
@@ -557,7 +595,7 @@ def submit_image(prompt: str, **opts: Any) -> str:
         logger.info("submit_image: FULL ENGLISH PROMPT: '{}'", input_payload["prompt"])
     logger.debug("submit_image: full payload: {}", input_payload)
 
-    response = queue_submit(model, input_payload)
+    response = queue_submit(model, input_payload, webhook=webhook)
     logger.debug("fal submit_image_edit response: {}", response)
     task_id = response.get("request_id")
     if not task_id:
@@ -574,7 +612,14 @@ def submit_image(prompt: str, **opts: Any) -> str:
     return task_id
 
 
-def submit_image_edit(image_path: str, prompt: str, mask_path: str | None = None, **opts: Any) -> str:
+def submit_image_edit(
+    image_path: str,
+    prompt: str,
+    mask_path: str | None = None,
+    *,
+    webhook: bool = False,
+    **opts: Any,
+) -> str:
     _purge_cache()
     preset = opts.pop("preset", None)
     requested_model = opts.pop("model", None)
@@ -741,7 +786,7 @@ def submit_image_edit(image_path: str, prompt: str, mask_path: str | None = None
     except Exception as exc:  # noqa: BLE001
         logger.warning("Failed to check payload size: {}", exc)
 
-    response = queue_submit(model, input_payload)
+    response = queue_submit(model, input_payload, webhook=webhook)
     task_id = response.get("request_id")
     if not task_id:
         raise RuntimeError("fal queue response did not include request_id")
@@ -762,6 +807,7 @@ def submit_image_upscale(
     image_url: str | None = None,
     image_path: str | None = None,
     scale: int = 2,
+    webhook: bool = False,
     **opts: Any,
 ) -> str:
     _purge_cache()
@@ -774,7 +820,7 @@ def submit_image_upscale(
     input_payload: Dict[str, Any] = apply_model_defaults(model, {})
 
     if model in QUEUE_UPSCALE_MODELS:
-        input_payload["image_url"] = _ensure_png_data_url(image_path=image_path, image_url=image_url)
+        input_payload["image_url"] = _ensure_upscale_png_data_url(image_path=image_path, image_url=image_url)
         # For queue models, scale is passed as a separate parameter
         # Always set scale explicitly to ensure it's used
         input_payload["scale"] = scale
@@ -799,7 +845,7 @@ def submit_image_upscale(
                 input_payload.get("scale"),
                 input_payload.get("output_format"))
 
-    response = queue_submit(model, input_payload)
+    response = queue_submit(model, input_payload, webhook=webhook)
     task_id = response.get("request_id")
     if not task_id:
         raise RuntimeError("fal queue response did not include request_id")
@@ -839,7 +885,7 @@ def run_image_upscale(
 
     if model in QUEUE_UPSCALE_MODELS:
         payload.update(safe_opts)
-        payload["image_url"] = _ensure_png_data_url(image_path=image_path, image_url=image_url)
+        payload["image_url"] = _ensure_upscale_png_data_url(image_path=image_path, image_url=image_url)
         payload.setdefault("sync_mode", True)
 
         result = run_model(model, payload)
@@ -1008,9 +1054,36 @@ def run_image_edit(image_path: str, prompt: str, mask_path: str | None = None, *
     return ImageAsset(url=image_url, content=None, filename=filename)
 
 
+def _smart_merge_image_urls(image_sources: list[dict[str, str | None]]) -> list[str]:
+    """
+    Собирает image_urls для smart merge с сохранением порядка источников.
+    Локальные файлы (сжатие + base64) кодируются параллельно - с несколькими фото это основная часть времени отправки.
+    """
+    entries: list[str | Path] = []
+    for source in (image_sources or [])[:SMART_MERGE_MAX_IMAGES]:
+        if not isinstance(source, dict):
+            continue
+        url = source.get("url")
+        path = source.get("path")
+        if url:
+            entries.append(url)
+        elif path:
+            entries.append(Path(path))
+
+    paths = [entry for entry in entries if isinstance(entry, Path)]
+    if len(paths) > 1:
+        with ThreadPoolExecutor(max_workers=len(paths), thread_name_prefix="smart-merge-encode") as pool:
+            encoded = dict(zip(paths, pool.map(_encode_file_to_data_url, paths)))
+    else:
+        encoded = {path: _encode_file_to_data_url(path) for path in paths}
+    return [encoded[entry] if isinstance(entry, Path) else entry for entry in entries]
+
+
 def submit_smart_merge(
     image_sources: list[dict[str, str | None]],
     prompt: str,
+    *,
+    webhook: bool = False,
     **opts: Any,
 ) -> str:
     """Submit smart merge job to queue and return task_id."""
@@ -1046,16 +1119,7 @@ def submit_smart_merge(
             logger.debug("submit_smart_merge: Removed field '{}' from Seedream v4.5/edit payload", key)
         logger.info("submit_smart_merge: Seedream v4.5/edit final payload after cleanup: keys={}", list(input_payload.keys()))
 
-    final_urls: list[str] = []
-    for source in (image_sources or [])[:SMART_MERGE_MAX_IMAGES]:
-        if not isinstance(source, dict):
-            continue
-        url = source.get("url")
-        path = source.get("path")
-        if url:
-            final_urls.append(url)
-        elif path:
-            final_urls.append(_encode_file_to_data_url(path))
+    final_urls = _smart_merge_image_urls(image_sources)
     if not final_urls:
         raise ValueError("Smart merge requires at least one valid image url or path")
 
@@ -1065,7 +1129,7 @@ def submit_smart_merge(
     if "seedream/v4.5/edit" not in model.lower():
         input_payload.setdefault("image_url", final_urls[0])
 
-    response = queue_submit(model, input_payload)
+    response = queue_submit(model, input_payload, webhook=webhook)
     logger.debug("fal submit_smart_merge response: {}", response)
     task_id = response.get("request_id")
     if not task_id:
@@ -1124,16 +1188,7 @@ def run_smart_merge(
     logger.info("run_smart_merge: AFTER apply_model_defaults - input_payload keys: {}, width={}, height={}", 
                list(input_payload.keys()), input_payload.get("width"), input_payload.get("height"))
 
-    final_urls: list[str] = []
-    for source in (image_sources or [])[:SMART_MERGE_MAX_IMAGES]:
-        if not isinstance(source, dict):
-            continue
-        url = source.get("url")
-        path = source.get("path")
-        if url:
-            final_urls.append(url)
-        elif path:
-            final_urls.append(_encode_file_to_data_url(path))
+    final_urls = _smart_merge_image_urls(image_sources)
     if not final_urls:
         raise ValueError("Smart merge requires at least one valid image url or path")
 
@@ -1292,6 +1347,7 @@ def submit_face_swap(
     target_path: str,
     prompt: str | None = None,
     model: str | None = None,
+    webhook: bool = False,
     **opts: Any,
 ) -> str:
     """Submit face swap job to queue API for more reliable processing."""
@@ -1358,7 +1414,7 @@ def submit_face_swap(
     logger.info("submit_face_swap: FINAL model being sent to Fal.ai API: '{}' (original: '{}')", 
                  resolved_model, model_alias)
 
-    response = queue_submit(resolved_model, payload)
+    response = queue_submit(resolved_model, payload, webhook=webhook)
     task_id = response.get("request_id")
     if not task_id:
         raise RuntimeError("fal queue response did not include request_id")
@@ -1379,14 +1435,15 @@ def check_status(task_id: str) -> dict[str, Any]:
     entry = _TASK_CACHE.get(task_id)
     if not entry:
         return {"status": "not_found", "result_url": None, "error": "Task not found"}
+    cached = _cached_status(entry)
+    if cached is not None:
+        return cached
 
     status_data: dict[str, Any] | None = None
-    api_request_type = None
     if entry.get("status_url"):
         try:
             logger.debug("📡 API REQUEST: GET status_url for task {}: {}", task_id[:8], entry["status_url"][:80])
             status_data = queue_get(entry["status_url"])
-            api_request_type = "status_url"
         except Exception as exc:  # noqa: BLE001
             logger.warning("Failed to use cached status_url for {}: {}", task_id, exc)
             status_data = None
@@ -1395,8 +1452,38 @@ def check_status(task_id: str) -> dict[str, Any]:
         model = entry["model"]
         logger.debug("📡 API REQUEST: queue_status for task {} (model: {})", task_id[:8], model)
         status_data = queue_status(model, task_id)
-        api_request_type = "queue_status"
-    
+
+    return _apply_status_data(task_id, entry, status_data)
+
+
+async def check_status_async(task_id: str) -> dict[str, Any]:
+    """Async variant of check_status for polling without blocking the worker thread."""
+    _purge_cache()
+    entry = _TASK_CACHE.get(task_id)
+    if not entry:
+        return {"status": "not_found", "result_url": None, "error": "Task not found"}
+    cached = _cached_status(entry)
+    if cached is not None:
+        return cached
+
+    status_data: dict[str, Any] | None = None
+    if entry.get("status_url"):
+        try:
+            logger.debug("📡 API REQUEST: GET status_url (async) for task {}: {}", task_id[:8], entry["status_url"][:80])
+            status_data = await queue_get_async(entry["status_url"])
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("Failed to use cached status_url for {}: {}", task_id, exc)
+            status_data = None
+
+    if status_data is None:
+        model = entry["model"]
+        logger.debug("📡 API REQUEST: queue_status (async) for task {} (model: {})", task_id[:8], model)
+        status_data = await queue_status_async(model, task_id)
+
+    return _apply_status_data(task_id, entry, status_data)
+
+
+def _apply_status_data(task_id: str, entry: dict[str, Any], status_data: dict[str, Any]) -> dict[str, Any]:
     status_raw = str(status_data.get("status", "UNKNOWN")).upper()
 
     if status_raw in {"COMPLETED", "COMPLETED_WITH_WARNINGS", "SUCCEEDED"}:
@@ -2031,3 +2118,25 @@ def resolve_result_asset(result_url: str) -> ImageAsset:
 
     return ImageAsset(url=image_url, content=None, filename=file_name)
 
+
+def resolve_result_asset_to_path(image_url: str, target_path: str | Path) -> ImageAsset:
+    """
+    Stream a direct image URL to disk without buffering the whole body in memory.
+    The body goes to a temp file next to target_path and is moved into place only after a complete download,
+    so an interrupted stream never leaves a truncated file that looks like a valid result.
+    """
+    path = Path(target_path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    client = _get_http_client()
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".part")
+    try:
+        with os.fdopen(fd, "wb") as file, client.stream("GET", image_url, follow_redirects=True) as response:
+            response.raise_for_status()
+            for chunk in response.iter_bytes(_STREAM_CHUNK_SIZE):
+                file.write(chunk)
+        os.replace(tmp_name, path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+    logger.debug("resolve_result_asset_to_path: streamed {} -> {} ({} bytes)", image_url[:100], path, path.stat().st_size)
+    return ImageAsset(url=image_url, content=None, filename=path.name)
@@ -1,8 +1,9 @@
 from __future__ import annotations
 
-from fastapi import FastAPI, HTTPException
+from fastapi import Body, FastAPI, HTTPException, Query
 
 from app.core import settings, setup_logging
+from app.core.fal_webhooks import FAL_WEBHOOK_TOKEN_PARAM, is_valid_webhook_token, signal_fal_completion
 from app.core.queues import get_job
 
 app = FastAPI(title="TG Media Service", version="0.1.0")
@@ -42,3 +43,18 @@ async def job_status(job_id: str) -> dict:
         "meta": job.meta,
     }
 
+
+@app.post("/webhooks/fal")
+def fal_webhook(
+    payload: dict = Body(...),
+    token: str | None = Query(None, alias=FAL_WEBHOOK_TOKEN_PARAM),
+) -> dict[str, str]:
+    """Принимает уведомление fal.ai о завершении задачи и будит ожидающий воркер."""
+    # Эндпоинт публичный: без секрета из fal_webhook_url любой мог бы писать сигналы в Redis
+    if not is_valid_webhook_token(token):
+        raise HTTPException(status_code=403, detail="Invalid webhook token")
+    request_id = payload.get("request_id") or payload.get("gateway_request_id")
+    if not request_id:
+        raise HTTPException(status_code=400, detail="request_id is required")
+    signal_fal_completion(str(request_id))
+    return {"status": "ok"}
@@ -1,8 +1,11 @@
 from __future__ import annotations
 
-# asyncio removed - using sync notifications now
+import asyncio
+import binascii
 import io
 import os
+import random
+import re
 import tempfile
 import time
 import threading
@@ -20,17 +23,22 @@ class JobTimeoutException(Exception):
     pass
 
 from app.core.config import settings
+from app.core.fal_webhooks import wait_for_fal_completion
+from app.core.upscale_cache import get_cached_upscale, store_cached_upscale, upscale_cache_key
 from app.core.queues import get_job
 import httpx
 
 from app.providers.fal import (
     check_image_status,
+    check_image_status_async,
     resolve_image_asset,
+    resolve_image_asset_to_path,
     run_smart_merge,
     submit_face_swap,
     submit_image,
     submit_image_edit,
     submit_image_upscale,
+    submit_smart_merge,
 )
 
 try:
@@ -38,16 +46,25 @@ try:
     WAVESPEED_AVAILABLE = True
 except ImportError:
     WAVESPEED_AVAILABLE = False
-from app.providers.fal.client import download_file, run_model
+from app.providers.fal.client import (
+    _get_headers,
+    _get_http_client,
+    async_http_client_scope,
+    download_file,
+    prewarm_http_client,
+    queue_result,
+    run_model,
+)
 from app.providers.fal.models_map import model_requires_mask
-from app.providers.fal.images import _extract_image_url, ImageAsset
+from app.providers.fal.images import _extract_image_url, _parse_result_url, ImageAsset, run_image_edit
 from app.providers.fal import images as fal_images
 from app.utils.translation import translate_to_english
 # Format conversion is not used - models receive aspect_ratio and return images with correct aspect ratio
 
 # Import models and initialize database to ensure tables exist
 from app.db import models  # noqa: F401
-from app.db.base import init_db
+from app.db.base import SessionLocal, init_db
+from app.services.billing import BillingService
 
 # Initialize database on module import
 try:
@@ -56,6 +73,9 @@ try:
 except Exception as e:
     logger.warning("Failed to initialize database in image_worker: {}", e)
 
+# Модуль импортируется в work horse перед выполнением задачи - соединения к fal.ai греются параллельно с ее подготовкой
+prewarm_http_client()
+
 UPSCALE_MAX_EDGE = 4096
 UPSCALE_INPUT_MAX_EDGE = 4096
 
@@ -76,9 +96,57 @@ FACE_SWAP_DEFAULT_MODEL = settings.fal_face_swap_model
 FACE_SWAP_MAX_ATTEMPTS = 3
 FACE_SWAP_RETRY_BASE_DELAY = 2.0
 
+# Политика повторов отправки задач (face swap, upscale) в одном месте: сетевые ошибки и эти HTTP-статусы
+SUBMIT_RETRYABLE_STATUSES = frozenset({408, 429, 500, 502, 503, 504})
+SUBMIT_RETRY_MAX_DELAY = 30.0
+
 UPSCALE_MAX_ATTEMPTS = 3
 UPSCALE_RETRY_BASE_DELAY = 2.0
 UPSCALE_POLL_MAX_ATTEMPTS = 36  # 3 minutes max (36 * 5 seconds) - matches RQ job timeout
+UPSCALE_POLL_INTERVAL = 5.0
+# Первые опросы чаще: небольшие апскейлы завершаются за 3-15 с, дальше интервал растет до UPSCALE_POLL_INTERVAL
+UPSCALE_POLL_INITIAL_INTERVAL = 1.0
+# Форматы входа апскейла, которые не нужно перекодировать: формат PIL -> допустимые расширения файла
+UPSCALE_PASSTHROUGH_FORMATS = {"PNG": (".png",), "JPEG": (".jpg", ".jpeg")}
+UPSCALE_PASSTHROUGH_MODES = ("RGB",)
+UPSCALE_PNG_COMPRESS_LEVEL = 1
+UPSCALE_POLL_TIMEOUT = UPSCALE_POLL_MAX_ATTEMPTS * UPSCALE_POLL_INTERVAL
+
+# Тип URL результата одним проходом: data: URL, queue API endpoint или прямой http(s) URL
+_RESULT_URL_KIND_RE = re.compile(r"(?P<data>data:)|(?P<queue>https?://queue\.fal\.run)|(?P<http>http)")
+# API endpoints обычно содержат "/requests/", "/response", "/result" или домен очереди
+_API_ENDPOINT_RE = re.compile(r"/requests/|/response|/result|queue\.fal\.run")
+# data: URL крупнее этого порога сразу сохраняется на диск, а не держится в памяти до уведомления
+DATA_URL_INLINE_MAX_BYTES = 1024 * 1024
+_CYRILLIC_RE = re.compile(r"[\u0400-\u04FF]")
+# Классификация моделей по имени: точные имена заранее, остальное - через regex с кэшированием результата
+_NB_RE = re.compile(r"nano-banana", re.I)
+_NB_PRO_RE = re.compile(r"nano-banana-pro", re.I)
+# (is_nano_banana, is_nano_banana_pro)
+_MODEL_FLAGS: dict[str, tuple[bool, bool]] = {
+    "fal-ai/nano-banana": (True, False),
+    "fal-ai/nano-banana/edit": (True, False),
+    "fal-ai/nano-banana-pro": (True, True),
+    "fal-ai/nano-banana-pro/edit": (True, True),
+}
+# Модели, используемые ИСКЛЮЧИТЕЛЬНО в режиме Stylish text
+STYLISH_EDIT_MODELS = frozenset({"fal-ai/ideogram/v2/edit", "fal-ai/reve/fast/edit", "fal-ai/gpt-image-1-mini/edit"})
+# Проверка готовности результата после COMPLETED (вместо фиксированной паузы)
+RESULT_READY_TIMEOUT = 5.0
+RESULT_READY_PROBE_TIMEOUT = 2.0
+RESULT_READY_INITIAL_DELAY = 0.2
+RESULT_READY_MAX_DELAY = 1.0
+# Полный traceback при ошибке отправки уведомления - только для отладки (NOTIFY_ERROR_TRACEBACK=1)
+NOTIFY_ERROR_TRACEBACK = os.getenv("NOTIFY_ERROR_TRACEBACK", "").lower() in ("1", "true", "yes")
+# Повторные попытки получения результата: decorrelated jitter в пределах бюджета по времени
+RESULT_RETRY_BASE_DELAY = 0.5
+RESULT_RETRY_MAX_DELAY = 10.0
+RESULT_RETRY_BUDGET = 8.0
+RESULT_FIRST_RETRY_DELAY = 0.25  # Первая пауза, только если результат еще не готов
+RESULT_RETRYABLE_STATUSES = (404, 500, 502, 503, 401)
+# Частый опрос с низким потолком: завершение замечается не позже чем через ~3 с (ретушь, smart merge)
+FAL_POLL_INITIAL_INTERVAL = 0.3
+FAL_POLL_MAX_INTERVAL = 3.0
 
 # Retry декоратор для обработки сетевых ошибок
 from functools import wraps
@@ -177,10 +245,15 @@ def _download_file_with_retry(url: str, path: str) -> None:
     download_file(url, path)
 
 
+@retry_on_network_error(max_attempts=3, base_delay=2.0)
+def _stream_asset_to_path_with_retry(url: str, path: Path) -> None:
+    """Потоковое сохранение результата на диск (атомарно) с автоматическим retry при сетевых ошибках."""
+    resolve_image_asset_to_path(url, path)
+
+
 @retry_on_network_error(max_attempts=3, base_delay=2.0)
 def _resolve_image_asset_with_retry(result_url: str):
     """Обертка для resolve_image_asset с автоматическим retry при сетевых ошибках."""
-    from app.providers.fal.images import resolve_result_asset as resolve_image_asset
     return resolve_image_asset(result_url)
 
 
@@ -232,18 +305,43 @@ def _handle_job_timeout(job_id: str, notify_options: dict[str, Any] | None, oper
             logger.error("Failed to send timeout notification for job {}: {}", job_id, notify_exc)
 
 
+# Каталоги результатов, уже созданные в этом процессе (пропускаем повторный mkdir)
+_MKDIR_CACHE: set[str] = set()
+
+
+def _ensure_dir(path: Path) -> None:
+    key = path.as_posix()
+    if key not in _MKDIR_CACHE:
+        path.mkdir(parents=True, exist_ok=True)
+        _MKDIR_CACHE.add(key)
+
+
+def _fast_write_bytes(path: Path, data: bytes) -> None:
+    """Записывает байты напрямую через os.write (без буферизированного файлового объекта)."""
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        view = memoryview(data)
+        while view:
+            written = os.write(fd, view)
+            view = view[written:]
+    finally:
+        os.close(fd)
+
+
 def _persist_asset(asset, output_path: str, skip_download: bool = False) -> Path | None:
     path = Path(output_path)
-    path.parent.mkdir(parents=True, exist_ok=True)
+    _ensure_dir(path.parent)
     if asset.content is not None:
         logger.info("_persist_asset: writing {} bytes (synchronous) to {}", len(asset.content), path)
-        path.write_bytes(asset.content)
-        logger.info("_persist_asset: successfully saved {} bytes to {}", path.stat().st_size, path)
+        _fast_write_bytes(path, asset.content)
+        logger.info("_persist_asset: successfully saved {} bytes to {}", len(asset.content), path)
         return path
     if asset.url and not skip_download:
         try:
             logger.info("📥 SYNC DOWNLOAD START: {} -> {}", asset.url[:80], path)
-            _download_file_with_retry(asset.url, path.as_posix())
+            # Потоковая запись чанками по 64 КБ через общий keep-alive клиент, тело целиком в память не попадает;
+            # одна политика повторов, файл появляется на месте только после полного скачивания
+            _stream_asset_to_path_with_retry(asset.url, path)
             if path.exists():
                 file_size = path.stat().st_size
                 logger.info("✅ SYNC DOWNLOAD COMPLETE: {} bytes ({:.2f} KB) saved to {}", 
@@ -258,6 +356,153 @@ def _persist_asset(asset, output_path: str, skip_download: bool = False) -> Path
     return None
 
 
+def _await_result_ready(url: str | None, timeout: float = RESULT_READY_TIMEOUT) -> None:
+    """
+    Ждет, пока результат станет доступен после статуса COMPLETED (иногда API сразу отвечает 500).
+    Вместо фиксированной паузы делает HEAD к result_url и повторяет только на 5xx/сетевых ошибках
+    с задержкой 0.2с -> 1с, но не дольше timeout. Остальные ответы обрабатывает основной retry-цикл.
+    """
+    if not url or not url.startswith("http"):
+        return
+    deadline = time.monotonic() + timeout
+    delay = RESULT_READY_INITIAL_DELAY
+    client = _get_http_client()
+    while True:
+        try:
+            response = client.head(
+                url,
+                headers=_get_headers(content_type=False),
+                timeout=RESULT_READY_PROBE_TIMEOUT,
+                follow_redirects=True,
+            )
+            if response.status_code < 500:
+                return
+            logger.debug("Result {} is not ready yet (HTTP {})", url[:100], response.status_code)
+        except httpx.RequestError as exc:
+            logger.debug("Result readiness probe failed for {}: {}", url[:100], exc)
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        time.sleep(min(delay, remaining))
+        delay = min(delay * 2, RESULT_READY_MAX_DELAY)
+
+
+def _resolve_to_direct_url(result_url: str, job_id: str, context: str = "Job") -> ImageAsset:
+    """
+    Получает результат через resolve_image_asset. Если вместо изображения вернулся queue API endpoint,
+    забирает ответ через queue_result и извлекает из него прямой URL изображения.
+    """
+    asset = resolve_image_asset(result_url)
+    if not (asset.url and _result_url_kind(asset.url) == "queue"):
+        return asset
+
+    logger.warning("{} {} asset.url is a queue API endpoint, this should not happen. asset.url={}", 
+                  context, job_id, asset.url)
+    # Try to get the actual result from queue_result
+    parsed = _parse_result_url(result_url)
+    if not parsed:
+        return asset
+    model_path, request_id = parsed
+    logger.info("{} {} trying queue_result directly for model={}, request_id={}", 
+               context, job_id, model_path, request_id)
+    response_data = queue_result(model_path, request_id)
+    logger.opt(lazy=True).debug("{} {} queue_result response keys: {}", lambda: context, lambda: job_id,
+                                lambda: list(response_data.keys()) if isinstance(response_data, dict) else "not a dict")
+    actual_image_url = _extract_image_url(response_data)
+    url_kind = _result_url_kind(actual_image_url) if actual_image_url else None
+    if url_kind == "http":
+        logger.info("{} {} extracted actual image URL: {}", context, job_id, actual_image_url[:100])
+        return ImageAsset(url=actual_image_url, content=None, filename=None)
+    if url_kind == "data":
+        # Результат пришел inline - отдаем байты, а не data: URL в поле url
+        logger.info("{} {} extracted inline image (data URL) from queue_result", context, job_id)
+        return ImageAsset(url=None, content=_decode_data_url(actual_image_url), filename=None)
+    logger.error("{} {} failed to extract valid image URL from queue_result response", context, job_id)
+    return asset
+
+
+def _next_backoff(prev: float, base: float = RESULT_RETRY_BASE_DELAY, cap: float = RESULT_RETRY_MAX_DELAY) -> float:
+    """Decorrelated jitter: случайная задержка в [base, prev*3], не больше cap - воркеры не ретраят синхронно."""
+    return min(cap, random.uniform(base, max(base, prev * 3)))
+
+
+def _resolve_result_when_ready(result_url: str, job_id: str, context: str = "Job") -> ImageAsset:
+    """
+    Забирает результат сразу после завершения задачи без фиксированной паузы.
+    Пока API еще готовит ответ (404/5xx), повторяет с jitter-backoff от RESULT_FIRST_RETRY_DELAY
+    в пределах RESULT_RETRY_BUDGET.
+    """
+    deadline = time.monotonic() + RESULT_RETRY_BUDGET
+    delay = RESULT_FIRST_RETRY_DELAY
+    attempt = 1
+    while True:
+        try:
+            return resolve_image_asset(result_url)
+        except httpx.HTTPStatusError as exc:
+            status_code = exc.response.status_code
+            if status_code not in RESULT_RETRYABLE_STATUSES or time.monotonic() + delay >= deadline:
+                raise
+            logger.warning("{} {} result attempt {} failed with {}. Retrying in {:.2f}s",
+                           context, job_id, attempt, status_code, delay)
+        except httpx.RequestError as exc:
+            if time.monotonic() + delay >= deadline:
+                raise
+            logger.warning("{} {} result attempt {} failed: {}. Retrying in {:.2f}s",
+                           context, job_id, attempt, exc, delay)
+        time.sleep(delay)
+        delay = _next_backoff(delay, base=RESULT_FIRST_RETRY_DELAY)
+        attempt += 1
+
+
+def _sleep_until_fal_done(task_id: str, seconds: float) -> None:
+    """Пауза между опросами статуса; при настроенном webhook fal.ai прерывается сразу по сигналу о завершении."""
+    if settings.fal_webhook_url:
+        try:
+            if wait_for_fal_completion(task_id, seconds):
+                logger.debug("fal webhook received for task {}", task_id)
+            return
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("Waiting for fal webhook failed for task {}: {}", task_id, exc)
+    time.sleep(seconds)
+
+
+def _model_flags(model_name: str) -> tuple[bool, bool]:
+    """Возвращает (is_nano_banana, is_nano_banana_pro) для имени модели."""
+    flags = _MODEL_FLAGS.get(model_name)
+    if flags is None:
+        flags = _MODEL_FLAGS[model_name] = (
+            _NB_RE.search(model_name) is not None,
+            _NB_PRO_RE.search(model_name) is not None,
+        )
+    return flags
+
+
+def _decode_data_url(data_url: str) -> bytes:
+    """Декодирует payload data: URL без промежуточной копии строки после запятой."""
+    raw = data_url.encode("ascii")
+    return binascii.a2b_base64(memoryview(raw)[raw.index(b",") + 1:])
+
+
+def _result_url_kind(url: str) -> str | None:
+    """Возвращает "data", "queue", "http" или None для URL результата из статуса."""
+    match = _RESULT_URL_KIND_RE.match(url)
+    return match.lastgroup if match else None
+
+
+def _ingest_data_url(data_url: str, output_file: Path | None = None) -> tuple[bytes | None, Path | None]:
+    """
+    Декодирует data: URL один раз.
+    Крупный результат (> 1 МБ) при известном пути сразу пишется в файл и не удерживается в памяти -
+    для уведомления он читается с диска по требованию.
+    """
+    content = _decode_data_url(data_url)
+    if output_file is not None and len(content) > DATA_URL_INLINE_MAX_BYTES:
+        _ensure_dir(output_file.parent)
+        _fast_write_bytes(output_file, content)
+        return None, output_file
+    return content, None
+
+
 def _schedule_result_download(job_id: str, url: str, target_path: Path) -> None:
     def _worker() -> None:
         try:
@@ -362,8 +607,12 @@ def _send_success_notification_sync(
     filename: str | None = None,
     caption_title: str = "🖼️ Готово!",
     reply_markup: InlineKeyboardMarkup | None = None,
+    image_path: Path | None = None,
 ) -> None:
-    """Send success notification synchronously (for use in workers)."""
+    """Send success notification synchronously (for use in workers).
+
+    image_path - уже сохраненный на диск результат: загружается из файла, без чтения целиком в память.
+    """
     from app.core.telegram_sync import send_document_sync
 
     # Используем только короткий заголовок без промпта
@@ -390,6 +639,17 @@ def _send_success_notification_sync(
             message_thread_id=notify.get("message_thread_id"),
             reply_markup=reply_markup_dict,
         )
+    elif image_path is not None:
+        logger.info("Sending image from file: {}, filename = {}", image_path, filename or image_path.name)
+        sent_message_id = send_document_sync(
+            chat_id=notify["chat_id"],
+            document=image_path,
+            filename=filename or image_path.name,
+            caption=caption,
+            reply_to_message_id=notify.get("reply_to_message_id"),
+            message_thread_id=notify.get("message_thread_id"),
+            reply_markup=reply_markup_dict,
+        )
     elif image_url:
         # Для всех моделей отправляем по URL напрямую
         # Это избегает двойного скачивания - асинхронное скачивание уже запущено для кеширования
@@ -451,19 +711,123 @@ def _parse_operation_id(operation_id_raw: Any, job_id: str, context: str = "") -
         return None
 
 
+def _billing_apply(action: str, operation_id: int, job_id: str, context: str, reason: str = "") -> None:
+    """Подтверждает/отменяет операцию в отдельной сессии БД: ошибка одной записи не влияет на следующие."""
+    db = SessionLocal()
+    try:
+        if action == "confirm":
+            if BillingService.confirm_operation(db, operation_id):
+                logger.info("Confirmed operation {} for {} {}", operation_id, context, job_id)
+            else:
+                logger.error("Failed to confirm operation {} for {} {}", operation_id, context, job_id)
+        else:
+            BillingService.fail_operation(db, operation_id)
+            logger.info("Marked operation {} as failed for {} {} due to {}", operation_id, context, job_id, reason)
+    except Exception as e:
+        logger.error("Error processing billing {} for operation {} ({} {}): {}",
+                     action, operation_id, context, job_id, e, exc_info=True)
+    finally:
+        db.close()
+
+
+def _billing_confirm(operation_id: int | None, job_id: str, context: str = "job") -> None:
+    """Подтверждает операцию (списание); без operation_id ничего не делает."""
+    if operation_id:
+        _billing_apply("confirm", operation_id, job_id, context)
+
+
+def _billing_fail(operation_id: int | None, job_id: str, context: str = "job", reason: str = "error") -> None:
+    """Отмечает операцию как неуспешную (без списания); без operation_id ничего не делает."""
+    if operation_id:
+        _billing_apply("fail", operation_id, job_id, context, reason)
+
+
 def _is_retryable_error(exc: Exception) -> bool:
-    """Check if error is retryable (network errors or server errors 500-503)"""
-    if isinstance(exc, httpx.RequestError):
-        logger.debug("Error is retryable (RequestError): {}", type(exc).__name__)
-        return True
-    if isinstance(exc, httpx.HTTPStatusError):
-        status_code = exc.response.status_code
-        is_retryable = status_code in (500, 502, 503)
-        logger.info("HTTPStatusError with status {}: retryable={}", status_code, is_retryable)
-        if is_retryable:
-            return True
-    logger.debug("Error is NOT retryable: {} ({})", type(exc).__name__, exc)
-    return False
+    """Check if error is retryable: network errors (httpx.RequestError) or SUBMIT_RETRYABLE_STATUSES"""
+    is_retryable = isinstance(exc, httpx.RequestError) or (
+        isinstance(exc, httpx.HTTPStatusError) and exc.response.status_code in SUBMIT_RETRYABLE_STATUSES
+    )
+    logger.opt(lazy=True).debug("Error {} retryable={}", lambda: type(exc).__name__, lambda: is_retryable)
+    return is_retryable
+
+
+_POLL_TERMINAL_STATUSES = ("succeeded", "failed")
+
+
+async def _async_sleep_until_fal_done(task_id: str, seconds: float) -> None:
+    """Async-вариант _sleep_until_fal_done: ожидание webhook выполняется в потоке, не блокируя event loop."""
+    if settings.fal_webhook_url:
+        try:
+            if await asyncio.to_thread(wait_for_fal_completion, task_id, seconds):
+                logger.debug("fal webhook received for task {}", task_id)
+            return
+        except Exception as exc:  # noqa: BLE001
+            logger.warning("Waiting for fal webhook failed for task {}: {}", task_id, exc)
+    await asyncio.sleep(seconds)
+
+
+async def _poll_until_done(
+    task_id: str,
+    *,
+    interval: float,
+    timeout: float,
+    log_prefix: str,
+    max_interval: float | None = None,
+) -> tuple[dict[str, Any], int]:
+    """
+    Опрашивает статус задачи fal.ai без блокировки потока (asyncio.sleep + общий httpx.AsyncClient).
+    Бюджет ожидания считается по time.monotonic() от единого дедлайна, а не по числу попыток.
+    Если задан max_interval, интервал между попытками выбирается через _next_backoff (от interval до max_interval).
+    Возвращает последний статус и количество запросов; нетерминальный статус означает, что время истекло.
+    """
+    started = time.monotonic()
+    deadline = started + timeout
+    base_interval = interval
+    poll_attempts = 0
+    previous_status = None
+    while True:
+        poll_attempts += 1
+        status = await check_image_status_async(task_id)
+        current_status = status.get("status")
+        # Логируем только смену статуса, а не каждую итерацию
+        if current_status != previous_status:
+            logger.debug("{} task {} status: {} -> {} (attempt {})",
+                         log_prefix, task_id, previous_status, current_status, poll_attempts)
+            previous_status = current_status
+        if current_status in _POLL_TERMINAL_STATUSES:
+            return status, poll_attempts
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return status, poll_attempts
+        if poll_attempts % 5 == 0:  # Логируем каждые 5 попыток
+            logger.info("📡 POLLING progress for {}: attempt {}, {:.0f}s/{:.0f}s elapsed, status={}",
+                        log_prefix, poll_attempts, time.monotonic() - started, timeout, current_status)
+        await _async_sleep_until_fal_done(task_id, min(interval, remaining))
+        if max_interval is not None:
+            interval = _next_backoff(interval, base=base_interval, cap=max_interval)
+
+
+def _poll_task_status(
+    task_id: str,
+    *,
+    interval: float,
+    timeout: float,
+    log_prefix: str,
+    max_interval: float | None = None,
+) -> tuple[dict[str, Any], int]:
+    """Синхронная точка входа для RQ-задач: запускает _poll_until_done в собственном event loop."""
+    async def _runner() -> tuple[dict[str, Any], int]:
+        # Async-клиент создается и закрывается вместе с этим event loop
+        async with async_http_client_scope():
+            return await _poll_until_done(
+                task_id,
+                interval=interval,
+                timeout=timeout,
+                log_prefix=log_prefix,
+                max_interval=max_interval,
+            )
+
+    return asyncio.run(_runner())
 
 
 def process_face_swap_job(
@@ -476,8 +840,6 @@ def process_face_swap_job(
 ) -> str:
     # Import models to ensure they are registered with Base.metadata
     from app.db import models  # noqa: F401
-    from app.services.billing import BillingService
-    from app.db.base import SessionLocal
 
     provider_options: Dict[str, Any] = dict(options or {})
     operation_id_raw = provider_options.pop("operation_id", None)
@@ -498,7 +860,8 @@ def process_face_swap_job(
     elif instruction:
         # Translate to English
         final_prompt = translate_to_english(instruction)
-        logger.info("Face swap job {}: translated instruction '{}' -> '{}'", job_id, instruction[:100], final_prompt[:100] if final_prompt else "none")
+        logger.opt(lazy=True).info("Face swap job {}: translated instruction '{}' -> '{}'",
+                                   lambda: job_id, lambda: instruction[:100], lambda: final_prompt[:100] if final_prompt else "none")
     else:
         final_prompt = None
 
@@ -615,40 +978,25 @@ def process_face_swap_job(
                     logger.debug("Face swap job {}: ensuring output file has .png extension: {}", job_id, output_file)
                 
                 _download_file_with_retry(result_url, output_file.as_posix())
-                logger.info("Face swap job {}: downloaded result as PNG ({} bytes)", job_id, output_file.stat().st_size if output_file.exists() else 0)
+                logger.info("Face swap job {}: downloaded result as PNG to {}", job_id, output_file)
 
                 # Отправляем результат в Telegram
                 if notify_options.get("chat_id"):
                     try:
-                        # Читаем файл для отправки
-                        with open(output_file, "rb") as f:
-                            image_bytes = f.read()
-                        logger.info("Face swap job {}: sending notification with image bytes ({} bytes)", job_id, len(image_bytes))
-                        # Определяем имя файла для отправки
-                        filename = output_file.name
+                        # Файл уже на диске - загружаем его в Telegram напрямую из файла
+                        logger.info("Face swap job {}: sending notification with saved file {}", job_id, output_file)
                         _send_success_notification_sync(
                             notify_options,
                             job_id,
-                            image_bytes=image_bytes,
-                            filename=filename,
+                            image_path=output_file,
+                            filename=output_file.name,
                             caption_title="🤖 Замена лица готова!",
                         )
                     except Exception as notify_error:
                         logger.error("Failed to send Telegram notification for face swap job {}: {}", job_id, notify_error)
 
                 # Confirm operation after successful completion (WaveSpeedAI path)
-                if operation_id:
-                    db = SessionLocal()
-                    try:
-                        success = BillingService.confirm_operation(db, operation_id)
-                        if success:
-                            logger.info("Confirmed operation {} for face swap job {} (WaveSpeedAI)", operation_id, job_id)
-                        else:
-                            logger.error("Failed to confirm operation {} for face swap job {} (WaveSpeedAI)", operation_id, job_id)
-                    except Exception as e:
-                        logger.error("Error confirming operation {} for face swap job {} (WaveSpeedAI): {}", operation_id, job_id, e, exc_info=True)
-                    finally:
-                        db.close()
+                _billing_confirm(operation_id, job_id, "face swap (WaveSpeedAI) job")
 
                 return output_file.as_posix()
             except Exception as wavespeed_exc:
@@ -688,6 +1036,7 @@ def process_face_swap_job(
                     target_path=target_file.as_posix(),
                     prompt=final_prompt,
                     model=model_name,
+                    webhook=True,
                     **clean_options,
                 )
                 logger.info("Face swap job {} submitted to queue with task_id: {}", job_id, task_id)
@@ -697,63 +1046,63 @@ def process_face_swap_job(
                 attempts += 1
                 logger.info("Face swap job {} submit attempt {} caught exception: {} ({})", 
                            job_id, attempts, type(exc).__name__, exc)
-            is_retryable = _is_retryable_error(exc)
-            logger.info("Face swap job {} submit attempt {}: is_retryable={}, attempts_left={}", 
-                       job_id, attempts, is_retryable, FACE_SWAP_MAX_ATTEMPTS - attempts)
-            if is_retryable and attempts < FACE_SWAP_MAX_ATTEMPTS:
-                error_type = "network/server" if isinstance(exc, (httpx.RequestError, httpx.HTTPStatusError)) else "error"
-                logger.warning(
-                    "Face swap job {} submit attempt {} failed due to {} issue: {}. Retrying in {:.1f}s",
-                    job_id,
-                    attempts,
-                    error_type,
-                    exc,
-                    delay,
-                )
-                time.sleep(delay)
-                delay *= 2
-                continue
-            logger.error("Face swap job {} submit failed after {} attempts: {}", job_id, attempts, exc)
-
-            # Determine error message based on error type
-            if isinstance(exc, httpx.HTTPStatusError):
-                status_code = exc.response.status_code
-                if status_code == 500:
-                    error_msg = (
-                        "Сервер временно недоступен (ошибка 500). "
-                        "Это проблема на стороне сервиса fal.ai. "
-                        "Попробуйте повторить запрос через несколько минут."
-                    )
-                elif status_code == 422:
-                    error_msg = (
-                        "Некорректные параметры запроса (ошибка 422). "
-                        "Проверьте, что загружены корректные изображения с лицами."
+                is_retryable = _is_retryable_error(exc)
+                logger.info("Face swap job {} submit attempt {}: is_retryable={}, attempts_left={}", 
+                           job_id, attempts, is_retryable, FACE_SWAP_MAX_ATTEMPTS - attempts)
+                if is_retryable and attempts < FACE_SWAP_MAX_ATTEMPTS:
+                    error_type = "network/server" if isinstance(exc, (httpx.RequestError, httpx.HTTPStatusError)) else "error"
+                    logger.warning(
+                        "Face swap job {} submit attempt {} failed due to {} issue: {}. Retrying in {:.1f}s",
+                        job_id,
+                        attempts,
+                        error_type,
+                        exc,
+                        delay,
                     )
-                elif status_code == 429:
+                    time.sleep(delay)
+                    delay = _next_backoff(delay, base=FACE_SWAP_RETRY_BASE_DELAY, cap=SUBMIT_RETRY_MAX_DELAY)
+                    continue
+                logger.error("Face swap job {} submit failed after {} attempts: {}", job_id, attempts, exc)
+
+                # Determine error message based on error type
+                if isinstance(exc, httpx.HTTPStatusError):
+                    status_code = exc.response.status_code
+                    if status_code == 500:
+                        error_msg = (
+                            "Сервер временно недоступен (ошибка 500). "
+                            "Это проблема на стороне сервиса fal.ai. "
+                            "Попробуйте повторить запрос через несколько минут."
+                        )
+                    elif status_code == 422:
+                        error_msg = (
+                            "Некорректные параметры запроса (ошибка 422). "
+                            "Проверьте, что загружены корректные изображения с лицами."
+                        )
+                    elif status_code == 429:
+                        error_msg = (
+                            "Превышен лимит запросов (ошибка 429). "
+                            "Подождите немного и попробуйте снова."
+                        )
+                    else:
+                        error_msg = f"Ошибка API (код {status_code}). Попробуйте позже."
+                elif isinstance(exc, httpx.RequestError):
                     error_msg = (
-                        "Превышен лимит запросов (ошибка 429). "
-                        "Подождите немного и попробуйте снова."
+                        "Проблема с сетью при обращении к API. "
+                        "Проверьте подключение к интернету и попробуйте снова."
                     )
                 else:
-                    error_msg = f"Ошибка API (код {status_code}). Попробуйте позже."
-            elif isinstance(exc, httpx.RequestError):
-                error_msg = (
-                    "Проблема с сетью при обращении к API. "
-                    "Проверьте подключение к интернету и попробуйте снова."
-                )
-            else:
-                error_msg = f"Не удалось отправить запрос на замену лица: {str(exc)}. Попробуйте позже."
+                    error_msg = f"Не удалось отправить запрос на замену лица: {str(exc)}. Попробуйте позже."
 
-            if job:
-                job.meta["error"] = str(exc)
-                job.meta["error_message"] = error_msg
-                job.save_meta()
-            if notify_options.get("chat_id"):
-                _send_failure_notification_sync(
-                    notify_options,
-                    job_id,
-                    error_msg,
-                )
+                if job:
+                    job.meta["error"] = str(exc)
+                    job.meta["error_message"] = error_msg
+                    job.save_meta()
+                if notify_options.get("chat_id"):
+                    _send_failure_notification_sync(
+                        notify_options,
+                        job_id,
+                        error_msg,
+                    )
                 raise
 
         if task_id is None:
@@ -767,25 +1116,23 @@ def process_face_swap_job(
 
         # Poll for completion using queue API
         logger.info("Face swap job {} polling for task {} completion", job_id, task_id)
-        status = check_image_status(task_id)
-        max_poll_attempts = 60  # 5 minutes max (60 * 5 seconds)
-        poll_attempts = 0
-
-        while status["status"] not in ("succeeded", "failed"):
-            if poll_attempts >= max_poll_attempts:
-                error = "Face swap task timed out after polling"
-                logger.error("Face swap job {} task {} timed out", job_id, task_id)
-                if job:
-                    job.meta["error"] = error
-                    job.save_meta()
-                if notify_options.get("chat_id"):
-                    _send_failure_notification_sync(notify_options, job_id, "Задача превысила время ожидания. Попробуйте позже.")
-                raise RuntimeError(error)
+        poll_timeout = 300.0  # 5 minutes max
+        status, poll_attempts = _poll_task_status(
+            task_id,
+            interval=5.0,  # Poll every 5 seconds
+            timeout=poll_timeout,
+            log_prefix=f"Face swap job {job_id}",
+        )
 
-            poll_attempts += 1
-            time.sleep(5)  # Poll every 5 seconds
-            status = check_image_status(task_id)
-            logger.debug("Face swap job {} task {} status: {}", job_id, task_id, status["status"])
+        if status["status"] not in _POLL_TERMINAL_STATUSES:
+            error = f"Face swap task timed out after polling for {int(poll_timeout)} seconds"
+            logger.error("Face swap job {} task {} timed out after {} status requests", job_id, task_id, poll_attempts)
+            if job:
+                job.meta["error"] = error
+                job.save_meta()
+            if notify_options.get("chat_id"):
+                _send_failure_notification_sync(notify_options, job_id, "Задача превысила время ожидания. Попробуйте позже.")
+            raise RuntimeError(error)
 
         if status["status"] == "failed":
             error = status.get("error", "Unknown error")
@@ -799,31 +1146,28 @@ def process_face_swap_job(
 
         # According to fal.ai docs, when status is COMPLETED, the result may be in the status response itself
         # or available via response_url. Let's check if result is already in status first.
-        # Import the helper function to extract image URL from response
-        from app.providers.fal.images import _extract_image_url as extract_image_url
-        status_image_url = extract_image_url(status)
-        logger.debug("Face swap job {} extracted URL from status: {}", job_id, status_image_url[:100] if status_image_url else "None")
+        status_image_url = _extract_image_url(status)
+        logger.opt(lazy=True).debug("Face swap job {} extracted URL from status: {}",
+                                    lambda: job_id, lambda: status_image_url[:100] if status_image_url else "None")
         asset = None
+        ingested_path: Path | None = None
 
         if status_image_url:
             # Check if this is a queue API endpoint (response_url) or a real image URL
-            if status_image_url.startswith("https://queue.fal.run") or status_image_url.startswith("http://queue.fal.run"):
+            url_kind = _result_url_kind(status_image_url)
+            if url_kind == "queue":
                 # This is a queue API endpoint, not a direct image URL - skip it
                 logger.info("Face swap job {} found response_url in status (not a direct image URL), will use resolve_image_asset", job_id)
                 status_image_url = None
                 asset = None  # Ensure asset is None so we use resolve_image_asset
-            elif status_image_url.startswith("data:"):
+            elif url_kind == "data":
                 logger.info("Face swap job {} result found in status response (data URL)", job_id)
                 # Result is already in status as data URL, extract it directly
-                from app.providers.fal.images import ImageAsset
-                import base64
-                header, _, data_part = status_image_url.partition(",")
-                content = base64.b64decode(data_part)
+                content, ingested_path = _ingest_data_url(status_image_url, output_file)
                 asset = ImageAsset(url=None, content=content, filename="face-swap.png")
-            elif status_image_url.startswith("http"):
+            elif url_kind == "http":
                 # This looks like a direct image URL (CDN, etc.)
                 logger.info("Face swap job {} result found in status response (direct URL): {}", job_id, status_image_url[:100])
-                from app.providers.fal.images import ImageAsset
                 asset = ImageAsset(url=status_image_url, content=None, filename=None)
             else:
                 logger.warning("Face swap job {} unexpected image URL format in status: {}", job_id, status_image_url[:100])
@@ -841,68 +1185,47 @@ def process_face_swap_job(
                     _send_failure_notification_sync(notify_options, job_id, "Задача завершена, но результат недоступен.")
                 raise RuntimeError(error)
 
-        # Small delay after completion to allow API to prepare the result
-        # Sometimes the API returns 500 immediately after COMPLETED status
-        logger.debug("Face swap job {} task {} completed, waiting 1s before fetching result", job_id, task_id)
-        time.sleep(1.0)
+            # Sometimes the API returns 500 immediately after COMPLETED status - probe until the result is ready
+            logger.debug("Face swap job {} task {} completed, probing result readiness", job_id, task_id)
+            _await_result_ready(result_url)
 
-        # Try to get result with retries and increasing delays
-        # Use resolve_image_asset which properly handles authorization and retries
-        max_result_attempts = 5
-        result_delay = 1.0
-        last_result_error: Exception | None = None
+            # Try to get result with retries and increasing delays
+            # Use resolve_image_asset which properly handles authorization and retries
+            max_result_attempts = 5
+            result_delay = 1.0
+            last_result_error: Exception | None = None
 
-        for result_attempt in range(max_result_attempts):
-            try:
-                logger.debug("Face swap job {} attempt {} to get result from {}", job_id, result_attempt + 1, result_url)
-                # Use resolve_image_asset which properly handles queue API authorization
-                asset = resolve_image_asset(result_url)
-                logger.info("Face swap job {} successfully got result on attempt {}: asset.url={}, asset.content={}", 
-                           job_id, result_attempt + 1, asset.url[:100] if asset.url else "None", asset.content is not None)
-                # Check if asset.url is a queue API endpoint - if so, we need to get the actual image URL
-                if asset.url and (asset.url.startswith("https://queue.fal.run") or asset.url.startswith("http://queue.fal.run")):
-                    logger.warning("Face swap job {} asset.url is a queue API endpoint, this should not happen. asset.url={}", 
-                                  job_id, asset.url)
-                    # Try to get the actual result from queue_result
-                    from app.providers.fal.client import queue_result
-                    from app.providers.fal.images import _extract_image_url, ImageAsset, _parse_result_url
-                    parsed = _parse_result_url(result_url)
-                    if parsed:
-                        model_path, request_id = parsed
-                        logger.info("Face swap job {} trying queue_result directly for model={}, request_id={}", 
-                                   job_id, model_path, request_id)
-                        response_data = queue_result(model_path, request_id)
-                        logger.info("Face swap job {} queue_result response keys: {}", job_id, list(response_data.keys()) if isinstance(response_data, dict) else "not a dict")
-                        actual_image_url = _extract_image_url(response_data)
-                        if actual_image_url and not (actual_image_url.startswith("https://queue.fal.run") or actual_image_url.startswith("http://queue.fal.run")):
-                            logger.info("Face swap job {} extracted actual image URL: {}", job_id, actual_image_url[:100])
-                            asset = ImageAsset(url=actual_image_url, content=None, filename=None)
-                        else:
-                            logger.error("Face swap job {} failed to extract valid image URL from queue_result response", job_id)
-                break
-            except httpx.HTTPStatusError as exc:
-                last_result_error = exc
-                status_code = exc.response.status_code
-                if status_code in (500, 502, 503, 401) and result_attempt < max_result_attempts - 1:
-                    logger.warning(
-                        "Face swap job {} result attempt {} failed with {}: {}. Retrying in {:.1f}s",
-                        job_id,
-                        result_attempt + 1,
-                        status_code,
-                        exc.response.text[:100] if hasattr(exc.response, 'text') else str(exc),
-                        result_delay,
-                    )
-                    time.sleep(result_delay)
-                    result_delay *= 1.5
-                    continue
-                else:
-                    logger.error("Face swap job {} result attempt {} failed with {}: {}", job_id, result_attempt + 1, status_code, exc)
-                    raise
-            except Exception as exc:  # noqa: BLE001
-                last_result_error = exc
-                logger.error("Face swap job {} result attempt {} failed: {}", job_id, result_attempt + 1, exc)
-                if result_attempt >= max_result_attempts - 1:
-                    raise
+            for result_attempt in range(max_result_attempts):
+                try:
+                    logger.debug("Face swap job {} attempt {} to get result from {}", job_id, result_attempt + 1, result_url)
+                    # Use resolve_image_asset which properly handles queue API authorization
+                    asset = _resolve_to_direct_url(result_url, job_id, "Face swap job")
+                    logger.opt(lazy=True).info("Face swap job {} successfully got result on attempt {}: asset.url={}, asset.content={}", 
+                               lambda: job_id, lambda: result_attempt + 1, lambda: asset.url[:100] if asset.url else "None", lambda: asset.content is not None)
+                    break
+                except httpx.HTTPStatusError as exc:
+                    last_result_error = exc
+                    status_code = exc.response.status_code
+                    if status_code in (500, 502, 503, 401) and result_attempt < max_result_attempts - 1:
+                        logger.warning(
+                            "Face swap job {} result attempt {} failed with {}: {}. Retrying in {:.1f}s",
+                            job_id,
+                            result_attempt + 1,
+                            status_code,
+                            exc.response.text[:100] if hasattr(exc.response, 'text') else str(exc),
+                            result_delay,
+                        )
+                        time.sleep(result_delay)
+                        result_delay *= 1.5
+                        continue
+                    else:
+                        logger.error("Face swap job {} result attempt {} failed with {}: {}", job_id, result_attempt + 1, status_code, exc)
+                        raise
+                except Exception as exc:  # noqa: BLE001
+                    last_result_error = exc
+                    logger.error("Face swap job {} result attempt {} failed: {}", job_id, result_attempt + 1, exc)
+                    if result_attempt >= max_result_attempts - 1:
+                        raise
 
         if asset is None:
             error = last_result_error or RuntimeError("Failed to get face swap result")
@@ -934,15 +1257,15 @@ def process_face_swap_job(
 
         # Try to persist asset locally, but don't block on it
         # If asset has content, save it immediately
-        saved_path = None
+        saved_path = ingested_path
         image_bytes = asset.content
         filename = asset.filename
 
         if image_bytes:
             # We have content, save it immediately
             try:
-                output_file.parent.mkdir(parents=True, exist_ok=True)
-                output_file.write_bytes(image_bytes)
+                _ensure_dir(output_file.parent)
+                _fast_write_bytes(output_file, image_bytes)
                 saved_path = output_file
                 filename = filename or output_file.name
             except Exception as exc:  # noqa: BLE001
@@ -968,63 +1291,50 @@ def process_face_swap_job(
             job.save_meta()
 
         caption_path = saved_path.as_posix() if saved_path else asset.url or ""
-        logger.success("Face swap job {} completed: {}", job_id, caption_path)
+        log = logger.bind(job_id=job_id, task_id=task_id, phase="notify")
 
+        notify_kwargs: dict[str, Any] | None = None
+        notify_mode = "disabled"
         if notify_options.get("chat_id"):
-            logger.info("Face swap job {}: preparing notification (image_bytes={}, saved_path={}, asset.url={})", 
-                        job_id, image_bytes is not None, saved_path, asset.url[:100] if asset.url else None)
-            try:
-                if image_bytes is None and saved_path and saved_path.exists():
-                    image_bytes = saved_path.read_bytes()
-                    filename = filename or saved_path.name
-                    logger.info("Face swap job {}: loaded image bytes from saved file ({} bytes)", job_id, len(image_bytes))
-            except Exception as exc:  # noqa: BLE001
-                logger.warning("Face swap job {}: failed to prepare bytes for notification: {}", job_id, exc)
-
             if image_bytes is not None:
-                logger.info("Face swap job {}: sending notification with image bytes ({} bytes)", job_id, len(image_bytes))
-                try:
-                    _send_success_notification_sync(
-                        notify_options,
-                        job_id,
-                        image_bytes=image_bytes,
-                        filename=filename or "face-swap.png",
-                        caption_title="🤖 Замена лица готова!",
-                        reply_markup=None,
-                    )
-                    logger.info("Face swap job {}: successfully sent notification with image bytes", job_id)
-                except Exception as notify_error:  # noqa: BLE001
-                    logger.error("Failed to send Telegram notification for face swap job {}: {}", job_id, notify_error)
+                notify_mode = "bytes"
+                notify_kwargs = {"image_bytes": image_bytes, "filename": filename or "face-swap.png"}
+            elif saved_path:
+                # Крупный data: URL уже сохранен на диск в _ingest_data_url - загружаем из файла
+                notify_mode = "file"
+                notify_kwargs = {"image_path": saved_path, "filename": filename or saved_path.name}
             elif asset.url:
                 # Fallback to sending the URL if bytes are unavailable
-                logger.info("Face swap job {}: sending notification with image URL: {}", job_id, asset.url[:100])
-                try:
-                    _send_success_notification_sync(
-                        notify_options,
-                        job_id,
-                        image_url=asset.url,
-                        caption_title="🤖 Замена лица готова!",
-                        reply_markup=None,
-                    )
-                    logger.info("Face swap job {}: successfully sent notification with image URL", job_id)
-                except Exception as notify_error:  # noqa: BLE001
-                    logger.error("Failed to send fallback notification for face swap job {}: {}", job_id, notify_error)
+                notify_mode = "url"
+                notify_kwargs = {"image_url": asset.url}
             else:
-                logger.error("Face swap job {}: cannot send notification - no image_bytes and no asset.url", job_id)
+                notify_mode = "unavailable"
+                log.error("Face swap job {}: cannot send notification - no image_bytes and no asset.url", job_id)
+
+        # Одна запись на фазу вместо отдельных строк "completed / preparing / loaded / sending"
+        log.opt(lazy=True).success(
+            "Face swap job {} completed: {} (notify={}, bytes={}, saved_path={}, url={})",
+            lambda: job_id,
+            lambda: caption_path,
+            lambda: notify_mode,
+            lambda: len(image_bytes) if image_bytes is not None else None,
+            lambda: saved_path,
+            lambda: asset.url[:100] if asset.url else None,
+        )
 
-        # Confirm operation after successful completion
-        if operation_id:
-            db = SessionLocal()
+        if notify_kwargs is not None:
             try:
-                success = BillingService.confirm_operation(db, operation_id)
-                if success:
-                    logger.info("Confirmed operation {} for face swap job {}", operation_id, job_id)
-                else:
-                    logger.error("Failed to confirm operation {} for face swap job {}", operation_id, job_id)
-            except Exception as e:
-                logger.error("Error confirming operation {} for face swap job {}: {}", operation_id, job_id, e, exc_info=True)
-            finally:
-                db.close()
+                _send_success_notification_sync(
+                    notify_options,
+                    job_id,
+                    caption_title="🤖 Замена лица готова!",
+                    **notify_kwargs,
+                )
+            except Exception as notify_error:  # noqa: BLE001
+                log.error("Failed to send Telegram notification for face swap job {}: {}", job_id, notify_error)
+
+        # Confirm operation after successful completion
+        _billing_confirm(operation_id, job_id, "face swap job")
 
         return caption_path
     except JobTimeoutException as timeout_exc:
@@ -1032,27 +1342,11 @@ def process_face_swap_job(
         logger.error("Face swap job {} timed out after 4 minutes", job_id)
         _handle_job_timeout(job_id, notify_options, "замены лица")
         # Mark operation as failed
-        if operation_id:
-            db = SessionLocal()
-            try:
-                BillingService.fail_operation(db, operation_id)
-                logger.info("Marked operation {} as failed for face swap job {} due to timeout", operation_id, job_id)
-            except Exception as fail_error:
-                logger.error("Error failing operation {} for face swap job {}: {}", operation_id, job_id, fail_error, exc_info=True)
-            finally:
-                db.close()
+        _billing_fail(operation_id, job_id, "face swap job", "timeout")
         raise
     except Exception as e:
         # Mark operation as failed on any error
-        if operation_id:
-            db = SessionLocal()
-            try:
-                BillingService.fail_operation(db, operation_id)
-                logger.info("Marked operation {} as failed for face swap job {} due to error", operation_id, job_id)
-            except Exception as fail_error:
-                logger.error("Error failing operation {} for face swap job {}: {}", operation_id, job_id, fail_error, exc_info=True)
-            finally:
-                db.close()
+        _billing_fail(operation_id, job_id, "face swap job")
         raise
 
 
@@ -1100,11 +1394,130 @@ def _enhance_flux2flex_prompt_for_cyrillic(prompt: str) -> str:
     return prompt
 
 
+# Профиль качества по имени модели считается один раз на процесс
+_QUALITY_PROFILE_KEYS: dict[str, str | None] = {}
+SEEDREAM_NEGATIVE_PROMPT = "glowing eyes, neon eyes, glowing green eyes, unnatural eye colors, eye glow, glowing effects on eyes, artifacts, distorted features, oversaturated, unrealistic lighting, glowing skin, neon effects"
+
+
+def _quality_profile_key(model_name: str) -> str | None:
+    """Определяет профиль настроек качества по имени модели (одна проверка вместо цепочки if/elif)."""
+    if model_name in _QUALITY_PROFILE_KEYS:
+        return _QUALITY_PROFILE_KEYS[model_name]
+    key = _QUALITY_PROFILE_KEYS[model_name] = _classify_quality_profile(model_name.lower())
+    return key
+
+
+def _classify_quality_profile(lowered: str) -> str | None:
+    if "nano-banana" in lowered:
+        if "pro" not in lowered:
+            return "nano-banana"
+        if "nano-banana-pro" in lowered:
+            return "nano-banana-pro"
+        return None
+    if "seedream" in lowered:
+        return "seedream"
+    return None
+
+
+def _apply_nano_banana_quality(provider_options: Dict[str, Any], job_id: str) -> None:
+    # Увеличиваем параметры качества для максимального результата (обычный nano-banana),
+    # если текущие значения меньше максимальных
+    steps = max(provider_options.get("num_inference_steps", 60), 60)
+    guidance = max(provider_options.get("guidance_scale", 9.0), 9.0)
+    provider_options.update({"num_inference_steps": steps, "guidance_scale": guidance})
+    logger.info("Image job {}: Applied quality settings for nano-banana: num_inference_steps={}, guidance_scale={}", 
+               job_id, steps, guidance)
+
+
+def _apply_nano_banana_pro_quality(provider_options: Dict[str, Any], job_id: str) -> None:
+    # Применяем максимальные настройки качества для nano-banana-pro (максимальная прорисовка)
+    provider_options.update({"num_inference_steps": 90, "guidance_scale": 10.0})
+    logger.info("Image job {}: Applied enhanced quality settings for nano-banana-pro: num_inference_steps={}, guidance_scale={}", 
+               job_id, 90, 10.0)
+
+
+def _apply_seedream_quality(provider_options: Dict[str, Any], job_id: str) -> None:
+    # Оптимизированные настройки для Seedream (баланс качества и естественности)
+    # Исправлено: снижены параметры для предотвращения артефактов (зеленые светящиеся глаза и т.д.)
+    # Быстрый режим (enhance_prompt_mode) для более естественной интерпретации промпта;
+    # negative_prompt для избежания неестественных эффектов (если не задан в base_options)
+    negative_prompt = provider_options.get("negative_prompt", SEEDREAM_NEGATIVE_PROMPT)
+    provider_options.update({
+        "num_inference_steps": 60,
+        "guidance_scale": 7.5,
+        "enhance_prompt_mode": "fast",
+        "negative_prompt": negative_prompt,
+    })
+    logger.info("Image job {}: Applied optimized quality settings for Seedream: num_inference_steps={}, guidance_scale={}, enhance_prompt_mode={}, negative_prompt={}", 
+               job_id, 60, 7.5, "fast", negative_prompt[:50] if negative_prompt else None)
+
+
+def _apply_no_quality_profile(provider_options: Dict[str, Any], job_id: str) -> None:
+    return None
+
+
+_QUALITY_PROFILES: dict[str | None, Callable[[Dict[str, Any], str], None]] = {
+    "nano-banana": _apply_nano_banana_quality,
+    "nano-banana-pro": _apply_nano_banana_pro_quality,
+    "seedream": _apply_seedream_quality,
+}
+
+
+def _apply_smart_merge_nano_banana_quality(provider_options: Dict[str, Any], job_id: str) -> None:
+    # Увеличиваем параметры качества для максимального результата (обычный nano-banana)
+    provider_options.update({"num_inference_steps": 90, "guidance_scale": 11.0})
+    logger.info("Smart merge job {}: Applied quality settings for nano-banana: num_inference_steps={}, guidance_scale={}", 
+               job_id, 90, 11.0)
+
+
+def _apply_smart_merge_nano_banana_pro_quality(provider_options: Dict[str, Any], job_id: str) -> None:
+    # Не перезаписываем параметры, если они уже установлены (например, из бота с оптимизированными значениями)
+    provider_options.setdefault("num_inference_steps", 100)  # Оптимизированное значение вместо 55
+    provider_options.setdefault("guidance_scale", 11.0)  # Оптимизированное значение вместо 8.5
+    logger.info("Smart merge job {}: Using parameters for nano-banana-pro: num_inference_steps={}, guidance_scale={}", 
+               job_id, provider_options.get("num_inference_steps"), provider_options.get("guidance_scale"))
+
+
+def _apply_smart_merge_seedream_quality(provider_options: Dict[str, Any], job_id: str) -> None:
+    # Оптимизированные настройки для Seedream (баланс качества и естественности)
+    # Исправлено: снижены параметры для предотвращения артефактов
+    provider_options.update({"num_inference_steps": 60, "guidance_scale": 7.5, "enhance_prompt_mode": "fast"})
+    negative_prompt = provider_options.setdefault("negative_prompt", SEEDREAM_NEGATIVE_PROMPT)
+    logger.info("Smart merge job {}: Applied optimized quality settings for Seedream: num_inference_steps={}, guidance_scale={}, enhance_prompt_mode={}, negative_prompt={}", 
+               job_id, 60, 7.5, "fast", negative_prompt[:50] if negative_prompt else None)
+
+
+_SMART_MERGE_QUALITY_PROFILES: dict[str | None, Callable[[Dict[str, Any], str], None]] = {
+    "nano-banana": _apply_smart_merge_nano_banana_quality,
+    "nano-banana-pro": _apply_smart_merge_nano_banana_pro_quality,
+    "seedream": _apply_smart_merge_seedream_quality,
+}
+# Модели smart merge, которые идут через queue API: имя модели -> метка для логов (None - синхронный режим)
+_SMART_MERGE_QUEUE_LABELS: dict[str, str | None] = {}
+
+
+def _smart_merge_queue_label(model_name: str) -> str | None:
+    """Возвращает метку */edit-модели для асинхронного режима smart merge или None."""
+    if model_name in _SMART_MERGE_QUEUE_LABELS:
+        return _SMART_MERGE_QUEUE_LABELS[model_name]
+    lowered = model_name.lower()
+    label = None
+    if "/edit" in lowered:
+        if "nano-banana-pro" in lowered:
+            label = "nano-banana-pro/edit"
+        elif "flux-2-pro" in lowered:
+            label = "flux-2-pro/edit"
+        elif "seedream" in lowered:
+            label = "seedream/edit"
+        elif "nano-banana" in lowered and "pro" not in lowered:
+            label = "nano-banana/edit"
+    _SMART_MERGE_QUEUE_LABELS[model_name] = label
+    return label
+
+
 def process_image_job(job_id: str, prompt: str, options: dict | None, output_path: str) -> str:
     # Import models to ensure they are registered with Base.metadata
     from app.db import models  # noqa: F401
-    from app.services.billing import BillingService
-    from app.db.base import SessionLocal
 
     provider_options: Dict[str, Any] = dict(options or {})
     logger.info("Image job {}: received options keys: {}", job_id, list(provider_options.keys()))
@@ -1116,7 +1529,7 @@ def process_image_job(job_id: str, prompt: str, options: dict | None, output_pat
     # КРИТИЧЕСКИ ВАЖНО: Проверяем модель ПЕРЕД извлечением provider_prompt, чтобы сразу установить правильный промпт
     model_name = provider_options.get("model", "")
     selected_model = provider_options.get("selected_model", "")
-    is_nano_banana = model_name == "fal-ai/nano-banana" or model_name == "fal-ai/nano-banana-pro" or "nano-banana" in model_name.lower()
+    is_nano_banana = _model_flags(model_name)[0]
     is_flux2flex = "flux-2-flex" in model_name.lower() or selected_model == "flux2flex-create"
     
     # Детальное логирование для отладки Flux 2 Flex
@@ -1145,14 +1558,14 @@ def process_image_job(job_id: str, prompt: str, options: dict | None, output_pat
         job.meta.update({"prompt": prompt})
         if prompt != provider_prompt:
             job.meta["provider_prompt"] = provider_prompt
-        job.save_meta()
+        # job.meta сохраняется в Redis один раз - при успехе или ошибке
 
     notify_options = _extract_notify_options(provider_options)
 
     try:
-        logger.info("Processing image job {} with prompt '{}'", job_id, prompt[:100])
-        logger.info("Image job {}: provider_prompt='{}' (same as prompt: {})", 
-                    job_id, provider_prompt[:100] if provider_prompt else "None", provider_prompt == prompt)
+        logger.opt(lazy=True).info("Processing image job {} with prompt '{}'", lambda: job_id, lambda: prompt[:100])
+        logger.opt(lazy=True).info("Image job {}: provider_prompt='{}' (same as prompt: {})", 
+                    lambda: job_id, lambda: provider_prompt[:100] if provider_prompt else "None", lambda: provider_prompt == prompt)
 
         # Проверяем, является ли модель Nano Banana Pro (gpt-create - внутренний ключ для UI)
         selected_model = provider_options.get("selected_model", "")
@@ -1181,7 +1594,7 @@ def process_image_job(job_id: str, prompt: str, options: dict | None, output_pat
             else:
                 # Если перевод не сработал, попробуем перевести здесь еще раз
                 # Проверяем, содержит ли промпт кириллицу (признак русского текста)
-                has_cyrillic = any('\u0400' <= char <= '\u04FF' for char in prompt)
+                has_cyrillic = _CYRILLIC_RE.search(prompt) is not None
                 logger.info("Image job {}: checking for Cyrillic in prompt: {}", job_id, has_cyrillic)
                 if has_cyrillic:
                     logger.warning("Image job {}: provider_prompt is same as original (likely Russian), attempting translation in worker", job_id)
@@ -1233,40 +1646,8 @@ def process_image_job(job_id: str, prompt: str, options: dict | None, output_pat
                 provider_options["num_inference_steps"] = 20
                 logger.info("Image job {}: Set num_inference_steps to 20 (min for Flux 2 Flex) for acceptable quality", job_id)
         
-        # Применяем настройки качества для nano-banana (обычный и pro)
-        is_nano_banana_regular = model_name == "fal-ai/nano-banana" or ("nano-banana" in model_name.lower() and "pro" not in model_name.lower())
-        is_nano_banana_pro = "nano-banana-pro" in model_name.lower()
-        
-        if is_nano_banana_regular:
-            # Увеличиваем параметры качества для максимального результата (обычный nano-banana)
-            current_steps = provider_options.get("num_inference_steps", 60)
-            current_guidance = provider_options.get("guidance_scale", 9.0)
-            # Увеличиваем, если текущие значения меньше максимальных
-            if current_steps < 60:
-                provider_options["num_inference_steps"] = 60
-            if current_guidance < 9.0:
-                provider_options["guidance_scale"] = 9.0
-            logger.info("Image job {}: Applied quality settings for nano-banana: num_inference_steps={}, guidance_scale={}", 
-                       job_id, provider_options.get("num_inference_steps"), provider_options.get("guidance_scale"))
-        elif is_nano_banana_pro:
-            # Применяем максимальные настройки качества для nano-banana-pro (максимальная прорисовка)
-            provider_options["num_inference_steps"] = 90
-            provider_options["guidance_scale"] = 10.0
-            logger.info("Image job {}: Applied enhanced quality settings for nano-banana-pro: num_inference_steps={}, guidance_scale={}", 
-                       job_id, provider_options.get("num_inference_steps"), provider_options.get("guidance_scale"))
-        elif "seedream" in model_name.lower():
-            # Оптимизированные настройки для Seedream (баланс качества и естественности)
-            # Исправлено: снижены параметры для предотвращения артефактов (зеленые светящиеся глаза и т.д.)
-            provider_options["num_inference_steps"] = 60
-            provider_options["guidance_scale"] = 7.5
-            # Быстрый режим для более естественной интерпретации промпта
-            provider_options["enhance_prompt_mode"] = "fast"
-            # Добавляем negative_prompt для избежания неестественных эффектов (если не задан в base_options)
-            if "negative_prompt" not in provider_options:
-                provider_options["negative_prompt"] = "glowing eyes, neon eyes, glowing green eyes, unnatural eye colors, eye glow, glowing effects on eyes, artifacts, distorted features, oversaturated, unrealistic lighting, glowing skin, neon effects"
-            logger.info("Image job {}: Applied optimized quality settings for Seedream: num_inference_steps={}, guidance_scale={}, enhance_prompt_mode={}, negative_prompt={}", 
-                       job_id, provider_options.get("num_inference_steps"), provider_options.get("guidance_scale"), 
-                       provider_options.get("enhance_prompt_mode"), provider_options.get("negative_prompt")[:50] if provider_options.get("negative_prompt") else None)
+        # Применяем настройки качества для nano-banana (обычный и pro) и seedream
+        _QUALITY_PROFILES.get(_quality_profile_key(model_name), _apply_no_quality_profile)(provider_options, job_id)
         
         logger.info("Image job {}: Submitting image job with model: {}", job_id, model_name)
         logger.info("Image job {}: provider_options keys: {}, width: {}, height: {}, num_inference_steps: {}, guidance_scale: {}", 
@@ -1276,71 +1657,60 @@ def process_image_job(job_id: str, prompt: str, options: dict | None, output_pat
         if is_flux2flex:
             logger.info("Image job {}: Flux 2 Flex FINAL parameters - num_inference_steps: {}, guidance_scale: {}", 
                        job_id, provider_options.get("num_inference_steps"), provider_options.get("guidance_scale"))
-        task_id = submit_image(prompt=provider_prompt, **provider_options)
+        task_id = submit_image(prompt=provider_prompt, webhook=True, **provider_options)
         asset = None
+        ingested_path: Path | None = None
 
         # Polling для получения результата (асинхронная процедура с интервалом 4 сек)
         if asset is None:
-            poll_attempts = 0
-            max_attempts = 45  # 3 минуты при интервале 4 сек (45 * 4 = 180 секунд)
+            poll_timeout = 180.0  # 3 минуты
             poll_interval = 4.0  # Интервал 4 секунды для проверки статуса
-            status: dict[str, Any]
-            logger.info("📡 POLLING START for job {} (task_id: {}): max_attempts={}, interval={}s", 
-                       job_id, task_id[:8] if task_id else "None", max_attempts, poll_interval)
-            while True:
-                poll_attempts += 1
-                logger.debug("📡 POLLING attempt {}/{} for job {} (task_id: {})", 
-                           poll_attempts, max_attempts, job_id, task_id[:8] if task_id else "None")
-                status = check_image_status(task_id)
-                current_status = status.get("status")
-                if current_status == "succeeded":
-                    logger.info("📡 POLLING COMPLETE for job {}: succeeded after {} attempts ({} API requests)", 
-                               job_id, poll_attempts, poll_attempts)
-                    break
-                if current_status == "failed":
-                    error = status.get("error", "Unknown error")
-                    logger.error("Image job {} failed: {}", job_id, error)
-                    if job:
-                        job.meta["error"] = error
-                        job.save_meta()
-                    if notify_options.get("chat_id"):
-                        _send_failure_notification_sync(notify_options, job_id, str(error))
-                    raise RuntimeError(error)
-                if poll_attempts >= max_attempts:
-                    error = f"fal request did not complete within {int(max_attempts * poll_interval)} seconds"
-                    logger.error("📡 POLLING TIMEOUT for job {}: {} attempts ({} API requests)", 
-                               job_id, poll_attempts, poll_attempts)
-                    if job:
-                        job.meta["error"] = error
-                        job.save_meta()
-                    if notify_options.get("chat_id"):
-                        _send_failure_notification_sync(notify_options, job_id, error)
-                    raise RuntimeError(error)
-                if poll_attempts % 5 == 0:  # Логируем каждые 5 попыток
-                    logger.info("📡 POLLING progress for job {}: attempt {}/{}, status={}", 
-                               job_id, poll_attempts, max_attempts, current_status)
-                time.sleep(poll_interval)
-
+            logger.opt(lazy=True).info("📡 POLLING START for job {} (task_id: {}): timeout={}s, interval={}s", 
+                       lambda: job_id, lambda: task_id[:8] if task_id else "None", lambda: poll_timeout, lambda: poll_interval)
+            status, poll_attempts = _poll_task_status(
+                task_id,
+                interval=poll_interval,
+                timeout=poll_timeout,
+                log_prefix=f"Image job {job_id}",
+            )
+            current_status = status.get("status")
+            if current_status == "succeeded":
+                logger.info("📡 POLLING COMPLETE for job {}: succeeded after {} attempts ({} API requests)", 
+                           job_id, poll_attempts, poll_attempts)
+            elif current_status == "failed":
+                error = status.get("error", "Unknown error")
+                logger.error("Image job {} failed: {}", job_id, error)
+                if job:
+                    job.meta["error"] = error
+                if notify_options.get("chat_id"):
+                    _send_failure_notification_sync(notify_options, job_id, str(error))
+                raise RuntimeError(error)
+            else:
+                error = f"fal request did not complete within {int(poll_timeout)} seconds"
+                logger.error("📡 POLLING TIMEOUT for job {}: {} attempts ({} API requests)", 
+                           job_id, poll_attempts, poll_attempts)
+                if job:
+                    job.meta["error"] = error
+                if notify_options.get("chat_id"):
+                    _send_failure_notification_sync(notify_options, job_id, error)
+                raise RuntimeError(error)
+
         # Получаем результат после завершения
         if asset is None:
             # Сначала проверяем, есть ли результат прямо в статусе (как для Seedream в редактировании)
-            from app.providers.fal.images import _extract_image_url as extract_image_url
-            status_image_url = extract_image_url(status)
+            status_image_url = _extract_image_url(status)
 
             if status_image_url:
                 # Проверяем формат URL
-                if status_image_url.startswith("data:"):
+                url_kind = _result_url_kind(status_image_url)
+                if url_kind == "data":
                     logger.info("Image job {} result found in status response (data URL)", job_id)
-                    from app.providers.fal.images import ImageAsset
-                    import base64
-                    header, _, data_part = status_image_url.partition(",")
-                    content = base64.b64decode(data_part)
+                    content, ingested_path = _ingest_data_url(status_image_url, output_file)
                     asset = ImageAsset(url=None, content=content, filename="image.png")
-                elif status_image_url.startswith("http") and not (status_image_url.startswith("https://queue.fal.run") or status_image_url.startswith("http://queue.fal.run")):
+                elif url_kind == "http":
                     logger.info("Image job {} result found in status response (direct URL): {}", job_id, status_image_url[:100])
-                    from app.providers.fal.images import ImageAsset
                     asset = ImageAsset(url=status_image_url, content=None, filename=None)
-                elif status_image_url.startswith("https://queue.fal.run") or status_image_url.startswith("http://queue.fal.run"):
+                elif url_kind == "queue":
                     # Это endpoint для получения результата, не прямой URL изображения
                     # Продолжаем с обычной логикой получения результата
                     logger.debug("Image job {} status contains queue endpoint, will resolve through resolve_image_asset", job_id)
@@ -1354,36 +1724,30 @@ def process_image_job(job_id: str, prompt: str, options: dict | None, output_pat
                     logger.error("Image job {} task {} completed without result URL or result in status", job_id, task_id)
                     if job:
                         job.meta["error"] = error
-                        job.save_meta()
                     if notify_options.get("chat_id"):
                         _send_failure_notification_sync(notify_options, job_id, error)
                     raise RuntimeError(error)
 
                 # Для nano-banana-pro используем URL напрямую, без resolve_image_asset
                 # чтобы избежать долгого скачивания файла
-                is_nano_banana_pro = model_name == "fal-ai/nano-banana-pro" or "nano-banana-pro" in model_name.lower()
+                is_nano_banana_pro = _model_flags(model_name)[1]
                 
                 if is_nano_banana_pro:
                     # Проверяем, что result_url - это прямой URL изображения, а не API endpoint
                     # API endpoints обычно содержат "/requests/" или "/response" или "/result"
-                    is_api_endpoint = (
-                        "/requests/" in result_url or 
-                        "/response" in result_url or 
-                        "/result" in result_url or
-                        "queue.fal.run" in result_url
-                    )
+                    is_api_endpoint = _API_ENDPOINT_RE.search(result_url) is not None
                     
                     if is_api_endpoint:
                         # Если это API endpoint, нужно получить прямой URL через resolve_image_asset
                         logger.warning("Image job {}: Nano Banana Pro result_url is API endpoint, will use resolve_image_asset to get direct URL: {}", 
                                      job_id, result_url[:100])
-                        # Небольшая задержка после завершения
-                        time.sleep(0.5)
+                        # Ждем готовности результата после завершения
+                        _await_result_ready(result_url)
                         # Получаем прямой URL через resolve_image_asset (но не скачиваем файл)
                         try:
                             asset = resolve_image_asset(result_url)
-                            logger.info("Image job {}: Got direct image URL from resolve_image_asset: {}", 
-                                       job_id, asset.url[:100] if asset.url else "None")
+                            logger.opt(lazy=True).info("Image job {}: Got direct image URL from resolve_image_asset: {}", 
+                                       lambda: job_id, lambda: asset.url[:100] if asset.url else "None")
                         except Exception as exc:
                             logger.error("Image job {}: Failed to get direct URL from resolve_image_asset: {}", job_id, exc)
                             raise
@@ -1391,12 +1755,11 @@ def process_image_job(job_id: str, prompt: str, options: dict | None, output_pat
                         # Это прямой URL изображения, можно использовать напрямую
                         logger.info("Image job {}: Nano Banana Pro detected, using result_url directly (direct image URL): {}", 
                                    job_id, result_url[:100])
-                        from app.providers.fal.images import ImageAsset
                         # Используем result_url как прямой URL изображения (Telegram сам скачает)
                         asset = ImageAsset(url=result_url, content=None, filename=None)
                 else:
-                    # Небольшая задержка после завершения, чтобы API успел подготовить результат
-                    time.sleep(0.5)
+                    # Ждем, пока API подготовит результат (HEAD-проба вместо фиксированной паузы)
+                    _await_result_ready(result_url)
 
                     # Получаем результат с повторными попытками (как для Nano-banana)
                     max_result_attempts = 3
@@ -1406,8 +1769,8 @@ def process_image_job(job_id: str, prompt: str, options: dict | None, output_pat
                     for result_attempt in range(max_result_attempts):
                         try:
                             asset = resolve_image_asset(result_url)
-                            logger.info("Image job {} successfully got result on attempt {}: asset.url={}, asset.content={}", 
-                                       job_id, result_attempt + 1, asset.url[:100] if asset.url else "None", asset.content is not None)
+                            logger.opt(lazy=True).info("Image job {} successfully got result on attempt {}: asset.url={}, asset.content={}", 
+                                       lambda: job_id, lambda: result_attempt + 1, lambda: asset.url[:100] if asset.url else "None", lambda: asset.content is not None)
                             break
                         except httpx.HTTPStatusError as exc:
                             last_result_error = exc
@@ -1442,7 +1805,6 @@ def process_image_job(job_id: str, prompt: str, options: dict | None, output_pat
                                 logger.warning("Image job {} rejected by content policy", job_id)
                                 if job:
                                     job.meta["error"] = "Content policy violation"
-                                    job.save_meta()
                                 if notify_options.get("chat_id"):
                                     _send_failure_notification_sync(notify_options, job_id, user_error_msg)
                                 raise RuntimeError("Content policy violation") from exc
@@ -1474,7 +1836,6 @@ def process_image_job(job_id: str, prompt: str, options: dict | None, output_pat
                         
                         if job:
                             job.meta["error"] = str(error)
-                            job.save_meta()
                         if notify_options.get("chat_id"):
                             _send_failure_notification_sync(notify_options, job_id, user_error_msg)
                         raise RuntimeError(str(error))
@@ -1496,10 +1857,10 @@ def process_image_job(job_id: str, prompt: str, options: dict | None, output_pat
             logger.info("💾 Image job {}: saving from memory ({} bytes, {:.2f} KB) - no download needed", 
                        job_id, len(image_bytes), file_size_kb)
             saved_path = _persist_asset(asset, output_file.as_posix())
-            if saved_path and saved_path.exists():
-                saved_size_kb = saved_path.stat().st_size / 1024
+            if saved_path:
+                # Размер известен из буфера в памяти - stat() не нужен
                 logger.info("✅ Image job {}: saved to disk - {:.2f} KB ({} bytes)", 
-                           job_id, saved_size_kb, saved_path.stat().st_size)
+                           job_id, file_size_kb, len(image_bytes))
         elif image_url:
             # Для всех моделей используем асинхронное скачивание
             # Отправляем по URL сразу, скачивание идет в фоне
@@ -1508,7 +1869,8 @@ def process_image_job(job_id: str, prompt: str, options: dict | None, output_pat
             # Планируем фоновое скачивание для кеширования
             _schedule_result_download(job_id, image_url, output_file)
         else:
-            saved_path = None
+            # Крупный data: URL уже сохранен на диск в _ingest_data_url
+            saved_path = ingested_path
 
         if job:
             if image_url:
@@ -1527,90 +1889,47 @@ def process_image_job(job_id: str, prompt: str, options: dict | None, output_pat
 
         logger.success("Image job {} completed: {}", job_id, image_url or filename or "binary")
         if notify_options.get("chat_id"):
+            # Проверяем saved_path из job.meta на случай, если фоновое скачивание уже завершилось
+            if saved_path is None and job and job.meta.get("result_path"):
+                saved_path = Path(job.meta["result_path"])
+                if not saved_path.exists():
+                    saved_path = None
+
+            if image_bytes is not None:
+                notify_kwargs: dict[str, Any] = {"image_bytes": image_bytes, "filename": filename}
+            elif saved_path:
+                # Используем уже скачанный файл вместо повторного скачивания: загрузка идет из файла
+                # (путь от _persist_asset существует; путь из job.meta проверен выше)
+                logger.info("Using already downloaded file for notification: {}", saved_path)
+                notify_kwargs = {"image_path": saved_path, "filename": filename or saved_path.name}
+            else:
+                # Для всех моделей с асинхронным скачиванием отправляем по URL напрямую
+                # Это избегает двойного скачивания (асинхронное уже запущено для кеширования)
+                # Telegram скачает файл сам, а мы кешируем его в фоне
+                logger.opt(lazy=True).info("📤 Sending by URL directly (async download in background, no duplicate download): {}",
+                                           lambda: image_url[:100] if image_url else "None")
+                notify_kwargs = {"image_url": image_url}
+
             try:
-                reply_markup = None
-                # Проверяем saved_path из job.meta на случай, если фоновое скачивание уже завершилось
-                if saved_path is None and job and job.meta.get("result_path"):
-                    saved_path = Path(job.meta["result_path"])
-                    if not saved_path.exists():
-                        saved_path = None
-                
-                if image_bytes is not None:
-                    _send_success_notification_sync(
-                        notify_options,
-                        job_id,
-                        image_bytes=image_bytes,
-                        filename=filename,
-                        reply_markup=reply_markup,
-                    )
-                elif saved_path and saved_path.exists():
-                    # Используем уже скачанный файл вместо повторного скачивания
-                    logger.info("Using already downloaded file for notification: {} (size: {:.2f} KB)", 
-                               saved_path, saved_path.stat().st_size / 1024)
-                    with open(saved_path, "rb") as f:
-                        image_bytes = f.read()
-                    _send_success_notification_sync(
-                        notify_options,
-                        job_id,
-                        image_bytes=image_bytes,
-                        filename=filename or saved_path.name,
-                        reply_markup=reply_markup,
-                    )
-                else:
-                    # Для всех моделей с асинхронным скачиванием отправляем по URL напрямую
-                    # Это избегает двойного скачивания (асинхронное уже запущено для кеширования)
-                    # Telegram скачает файл сам, а мы кешируем его в фоне
-                    logger.info("📤 Sending by URL directly (async download in background, no duplicate download): {}", image_url[:100] if image_url else "None")
-                    _send_success_notification_sync(
-                        notify_options,
-                        job_id,
-                        image_url=image_url,
-                        reply_markup=reply_markup,
-                    )
+                _send_success_notification_sync(notify_options, job_id, **notify_kwargs)
             except Exception as notify_error:  # noqa: BLE001
-                logger.error("Failed to send Telegram notification for job {}: {}", job_id, notify_error, exc_info=True)
+                logger.error("Failed to send Telegram notification for job {}: {}", job_id, notify_error,
+                             exc_info=NOTIFY_ERROR_TRACEBACK)
 
         # Confirm operation after successful completion
-        if operation_id:
-            # Используем DATABASE_URL из настроек (PostgreSQL или SQLite)
-            db = SessionLocal()
-            try:
-                logger.info("Confirming operation {} for job {}: using DATABASE_URL from settings", operation_id, job_id)
-                
-                # Проверяем, существует ли операция перед подтверждением
-                from app.db.models import Operation
-                operation_check = db.query(Operation).filter(Operation.id == operation_id).first()
-                if operation_check:
-                    logger.info("Operation {} found: status={}, type={}, user_id={}", 
-                               operation_id, operation_check.status, operation_check.type, operation_check.user_id)
-                else:
-                    logger.warning("Operation {} not found in database, will try to confirm anyway", operation_id)
-                
-                success = BillingService.confirm_operation(db, operation_id)
-                if success:
-                    logger.info("Confirmed operation {} for job {}", operation_id, job_id)
-                else:
-                    logger.error("Failed to confirm operation {} for job {}", operation_id, job_id)
-            except Exception as e:
-                logger.error("Error confirming operation {} for job {}: {}", operation_id, job_id, e, exc_info=True)
-            finally:
-                db.close()
+        # (BillingService.confirm_operation сам логирует диагностику, если операция не найдена)
+        _billing_confirm(operation_id, job_id)
 
         return image_url or ""
     except JobTimeoutException as timeout_exc:
         # Обработка таймаута задачи - отправляем уведомление пользователю
         logger.error("Image job {} timed out after 4 minutes", job_id)
         _handle_job_timeout(job_id, notify_options, "генерации изображения")
+        if job:
+            job.meta["error"] = "timeout"
+            job.save_meta()
         # Mark operation as failed
-        if operation_id:
-            db = SessionLocal()
-            try:
-                BillingService.fail_operation(db, operation_id)
-                logger.info("Marked operation {} as failed for job {} due to timeout", operation_id, job_id)
-            except Exception as fail_error:
-                logger.error("Error failing operation {} for job {}: {}", operation_id, job_id, fail_error, exc_info=True)
-            finally:
-                db.close()
+        _billing_fail(operation_id, job_id, reason="timeout")
         raise
     except Exception as e:
         error_str = str(e)
@@ -1661,16 +1980,11 @@ def process_image_job(job_id: str, prompt: str, options: dict | None, output_pat
             except Exception as notify_exc:
                 logger.error("Failed to send error notification for job {}: {}", job_id, notify_exc)
         
+        if job:
+            job.meta.setdefault("error", error_str)
+            job.save_meta()
         # Mark operation as failed on any error
-        if operation_id:
-            db = SessionLocal()
-            try:
-                BillingService.fail_operation(db, operation_id)
-                logger.info("Marked operation {} as failed for job {} due to error: {}", operation_id, job_id, error_type)
-            except Exception as fail_error:
-                logger.error("Error failing operation {} for job {}: {}", operation_id, job_id, fail_error, exc_info=True)
-            finally:
-                db.close()
+        _billing_fail(operation_id, job_id, reason=f"error: {error_type}")
         raise
 
 
@@ -1684,8 +1998,6 @@ def process_image_edit_job(
 ) -> str:
     # Import models to ensure they are registered with Base.metadata
     from app.db import models  # noqa: F401
-    from app.services.billing import BillingService
-    from app.db.base import SessionLocal
 
     provider_options: Dict[str, Any] = dict(options or {})
     operation_id_raw = provider_options.pop("operation_id", None)
@@ -1766,6 +2078,7 @@ def process_image_edit_job(
                 image_path=source_file.as_posix(),
                 prompt=provider_prompt,
                 mask_path=mask_file.as_posix() if mask_file else None,
+                webhook=True,
                 **provider_options,
             )
         except Exception as exc:  # noqa: BLE001
@@ -1777,72 +2090,59 @@ def process_image_edit_job(
                 _send_failure_notification_sync(notify_options, job_id, str(exc))
             raise
 
-        # Polling для получения результата с экспоненциальным backoff
-        poll_attempts = 0
-        max_attempts = 120  # allow up to ~4 minutes for edit jobs (with backoff)
-        poll_interval = 2.0  # Start with 2 seconds
-        min_interval = 2.0
-        max_interval = 10.0
-
+        # Polling для получения результата с экспоненциальным backoff (async, без блокировки потока)
         logger.info("Edit job {} polling for task {} completion", job_id, task_id)
-        while True:
-            status = check_image_status(task_id)
-            current_status = status.get("status")
-            # Логируем статус только каждые 5 попыток или при изменении статуса
-            if poll_attempts % 5 == 0 or current_status not in ("processing", "queued"):
-                logger.debug("Edit job {} task {} status: {} (attempt {})", job_id, task_id, current_status, poll_attempts + 1)
-
-            if current_status == "succeeded":
-                break
-            if current_status == "failed":
-                error = status.get("error", "Unknown error")
-                logger.error("Edit job {} task {} failed: {}", job_id, task_id, error)
-                if job:
-                    job.meta["error"] = error
-                    job.save_meta()
-                if notify_options.get("chat_id"):
-                    _send_failure_notification_sync(notify_options, job_id, f"Редактирование не удалось: {error}")
-                raise RuntimeError(error)
-
-            poll_attempts += 1
-            if poll_attempts >= max_attempts:
-                error = f"Редактирование превысило время ожидания"
-                logger.error("Edit job {} task {} timed out after {} attempts", job_id, task_id, poll_attempts)
-                if job:
-                    job.meta["error"] = error
-                    job.save_meta()
-                if notify_options.get("chat_id"):
-                    _send_failure_notification_sync(notify_options, job_id, "Задача превысила время ожидания. Попробуйте позже.")
-                raise RuntimeError(error)
+        status, poll_attempts = _poll_task_status(
+            task_id,
+            interval=2.0,  # Start with 2 seconds
+            timeout=240.0,  # allow up to ~4 minutes for edit jobs
+            log_prefix=f"Edit job {job_id}",
+            max_interval=10.0,  # Интервал растет с jitter до максимума
+        )
+        current_status = status.get("status")
 
-            # Экспоненциальный backoff: увеличиваем интервал до максимума
-            time.sleep(poll_interval)
-            poll_interval = min(poll_interval * 1.1, max_interval)  # Увеличиваем на 10% до максимума
+        if current_status == "failed":
+            error = status.get("error", "Unknown error")
+            logger.error("Edit job {} task {} failed: {}", job_id, task_id, error)
+            if job:
+                job.meta["error"] = error
+                job.save_meta()
+            if notify_options.get("chat_id"):
+                _send_failure_notification_sync(notify_options, job_id, f"Редактирование не удалось: {error}")
+            raise RuntimeError(error)
+        if current_status != "succeeded":
+            error = f"Редактирование превысило время ожидания"
+            logger.error("Edit job {} task {} timed out after {} attempts", job_id, task_id, poll_attempts)
+            if job:
+                job.meta["error"] = error
+                job.save_meta()
+            if notify_options.get("chat_id"):
+                _send_failure_notification_sync(notify_options, job_id, "Задача превысила время ожидания. Попробуйте позже.")
+            raise RuntimeError(error)
 
         # Получаем результат после завершения
         # Сначала проверяем, есть ли результат прямо в статусе
-        from app.providers.fal.images import _extract_image_url as extract_image_url
-        status_image_url = extract_image_url(status)
+        status_image_url = _extract_image_url(status)
         asset = None
+        download_scheduled = False
 
         if status_image_url:
             # Проверяем формат URL
-            if status_image_url.startswith("data:"):
+            url_kind = _result_url_kind(status_image_url)
+            if url_kind == "data":
                 logger.info("Edit job {} result found in status response (data URL)", job_id)
-                from app.providers.fal.images import ImageAsset
-                import base64
-                header, _, data_part = status_image_url.partition(",")
-                content = base64.b64decode(data_part)
+                content = _decode_data_url(status_image_url)
                 asset = ImageAsset(url=None, content=content, filename="edit.png")
-            elif status_image_url.startswith("http") and not (status_image_url.startswith("https://queue.fal.run") or status_image_url.startswith("http://queue.fal.run")):
+            elif url_kind == "http":
                 logger.info("Edit job {} result found in status response (direct URL): {}", job_id, status_image_url[:100])
-                from app.providers.fal.images import ImageAsset
                 asset = ImageAsset(url=status_image_url, content=None, filename=None)
+                # Скачивание стартует сразу и идет параллельно с записью meta и отправкой уведомления
+                _schedule_result_download(job_id, status_image_url, output_file)
+                download_scheduled = True
 
-        # Если результат не в статусе, получаем через result_url или response_url
+        # Если результат не в статусе, получаем через result_url (он уже заполнен из response_url очереди)
         if asset is None:
-            # Для nano-banana/edit используем response_url, если result_url отсутствует
-            result_url = status.get("result_url") or status.get("response_url")
+            result_url = status.get("result_url")
             if not result_url:
                 error = "Задача завершена, но результат недоступен"
                 logger.error("Edit job {} task {} completed without result URL or result in status", job_id, task_id)
@@ -1853,54 +2153,47 @@ def process_image_edit_job(
                     _send_failure_notification_sync(notify_options, job_id, error)
                 raise RuntimeError(error)
 
-            # Небольшая задержка после завершения, чтобы API успел подготовить результат
-            # Уменьшено с 1s до 0.5s для ускорения
-            time.sleep(0.5)
+            # Вместо фиксированной паузы - HEAD-проверка готовности результата
+            _await_result_ready(result_url)
 
-            # Получаем результат с повторными попытками
-            max_result_attempts = 3  # Уменьшено с 5 до 3 попыток
-            result_delay = 0.5  # Уменьшено с 1.0 до 0.5 секунды
-            last_result_error: Exception | None = None
+            # Получаем результат с повторными попытками в пределах бюджета по времени
+            result_deadline = time.monotonic() + RESULT_RETRY_BUDGET
+            result_delay = RESULT_RETRY_BASE_DELAY
+            result_attempt = 0
 
-            for result_attempt in range(max_result_attempts):
+            # Цикл завершается только с asset или исключением
+            while asset is None:
                 try:
                     asset = resolve_image_asset(result_url)
-                    logger.info("Edit job {} successfully got result on attempt {}: asset.url={}, asset.content={}", 
-                               job_id, result_attempt + 1, asset.url[:100] if asset.url else "None", asset.content is not None)
+                    logger.opt(lazy=True).info("Edit job {} successfully got result on attempt {}: asset.url={}, asset.content={}", 
+                               lambda: job_id, lambda: result_attempt + 1, lambda: asset.url[:100] if asset.url else "None", lambda: asset.content is not None)
                     break
                 except httpx.HTTPStatusError as exc:
-                    last_result_error = exc
                     status_code = exc.response.status_code
-                    if status_code in (500, 502, 503, 401) and result_attempt < max_result_attempts - 1:
-                        logger.warning(
+                    if status_code in (500, 502, 503, 401) and time.monotonic() + result_delay < result_deadline:
+                        # Тело ответа материализуется только если уровень WARNING включен
+                        logger.opt(lazy=True).warning(
                             "Edit job {} result attempt {} failed with {}: {}. Retrying in {:.1f}s",
-                            job_id,
-                            result_attempt + 1,
-                            status_code,
-                            exc.response.text[:100] if hasattr(exc.response, 'text') else str(exc),
-                            result_delay,
+                            lambda: job_id,
+                            lambda: result_attempt + 1,
+                            lambda: status_code,
+                            lambda: exc.response.text[:100] if hasattr(exc.response, 'text') else str(exc),
+                            lambda: result_delay,
                         )
                         time.sleep(result_delay)
-                        result_delay *= 1.5
+                        result_delay = _next_backoff(result_delay)
+                        result_attempt += 1
                         continue
                     else:
                         logger.error("Edit job {} result attempt {} failed with {}: {}", job_id, result_attempt + 1, status_code, exc)
                         raise
                 except Exception as exc:  # noqa: BLE001
-                    last_result_error = exc
                     logger.error("Edit job {} result attempt {} failed: {}", job_id, result_attempt + 1, exc)
-                    if result_attempt >= max_result_attempts - 1:
+                    if time.monotonic() + result_delay >= result_deadline:
                         raise
-
-            if asset is None:
-                error = last_result_error or RuntimeError("Failed to get edit result")
-                logger.error("Edit job {} failed to get result after {} attempts: {}", job_id, max_result_attempts, error)
-                if job:
-                    job.meta["error"] = str(error)
-                    job.save_meta()
-                if notify_options.get("chat_id"):
-                    _send_failure_notification_sync(notify_options, job_id, f"Не удалось получить результат: {error}")
-                raise RuntimeError(str(error))
+                    time.sleep(result_delay)
+                    result_delay = _next_backoff(result_delay)
+                    result_attempt += 1
 
         image_url = asset.url
         image_bytes = asset.content
@@ -1922,7 +2215,7 @@ def process_image_edit_job(
                 job.meta["result_path"] = None
             job.save_meta()
 
-        if saved_path is None and image_url:
+        if saved_path is None and image_url and not download_scheduled:
             _schedule_result_download(job_id, image_url, output_file)
 
         logger.success("Edit job {} completed: {}", job_id, image_url or filename or "binary")
@@ -1931,10 +2224,8 @@ def process_image_edit_job(
                 reply_markup = None
                 # Определяем заголовок: Stylish text только для моделей, используемых ИСКЛЮЧИТЕЛЬНО в Stylish text режиме
                 # Seedream используется и для обычного редактирования, поэтому не включаем её в этот список
-                stylish_models = {"fal-ai/ideogram/v2/edit", "fal-ai/reve/fast/edit", "fal-ai/gpt-image-1-mini/edit"}
-                is_stylish = model_name in stylish_models
-                logger.info("Edit job {}: model_name='{}', is_stylish={}, stylish_models={}", 
-                            job_id, model_name, is_stylish, stylish_models)
+                is_stylish = model_name in STYLISH_EDIT_MODELS
+                logger.info("Edit job {}: model_name='{}', is_stylish={}", job_id, model_name, is_stylish)
                 caption_title = "✨ Stylish text готов!" if is_stylish else "🛠️ Редактирование готово!"
                 logger.info("Edit job {}: caption_title='{}'", job_id, caption_title)
                 if image_bytes is not None:
@@ -1959,20 +2250,7 @@ def process_image_edit_job(
 
         # Confirm operation after successful completion
         if operation_id:
-            logger.info("Image edit job {}: attempting to confirm operation_id={} (type: {})", 
-                       job_id, operation_id, type(operation_id).__name__)
-            db = SessionLocal()
-            try:
-                success = BillingService.confirm_operation(db, operation_id)
-                if success:
-                    logger.info("Confirmed operation {} for edit job {}", operation_id, job_id)
-                else:
-                    logger.error("Failed to confirm operation {} for edit job {} - operation may not exist or already processed", 
-                               operation_id, job_id)
-            except Exception as e:
-                logger.error("Error confirming operation {} for edit job {}: {}", operation_id, job_id, e, exc_info=True)
-            finally:
-                db.close()
+            _billing_confirm(operation_id, job_id, "edit job")
         else:
             logger.warning("Image edit job {}: no operation_id provided, skipping billing confirmation", job_id)
 
@@ -1982,27 +2260,11 @@ def process_image_edit_job(
         logger.error("Image edit job {} timed out after 4 minutes", job_id)
         _handle_job_timeout(job_id, notify_options, "редактирования изображения")
         # Mark operation as failed
-        if operation_id:
-            db = SessionLocal()
-            try:
-                BillingService.fail_operation(db, operation_id)
-                logger.info("Marked operation {} as failed for edit job {} due to timeout", operation_id, job_id)
-            except Exception as fail_error:
-                logger.error("Error failing operation {} for edit job {}: {}", operation_id, job_id, fail_error, exc_info=True)
-            finally:
-                db.close()
+        _billing_fail(operation_id, job_id, "edit job", "timeout")
         raise
     except Exception as e:
         # Mark operation as failed on any error
-        if operation_id:
-            db = SessionLocal()
-            try:
-                BillingService.fail_operation(db, operation_id)
-                logger.info("Marked operation {} as failed for edit job {} due to error", operation_id, job_id)
-            except Exception as fail_error:
-                logger.error("Error failing operation {} for edit job {}: {}", operation_id, job_id, fail_error, exc_info=True)
-            finally:
-                db.close()
+        _billing_fail(operation_id, job_id, "edit job")
         raise
 
 
@@ -2019,8 +2281,6 @@ def process_retoucher_job(
                 job_id, mode, RETOUCHER_MODELS.get(mode, "default"))
     # Import models to ensure they are registered with Base.metadata
     from app.db import models  # noqa: F401
-    from app.services.billing import BillingService
-    from app.db.base import SessionLocal
 
     provider_options: Dict[str, Any] = dict(options or {})
     operation_id_raw = provider_options.pop("operation_id", None)
@@ -2037,6 +2297,7 @@ def process_retoucher_job(
     
     # Инициализируем asset = None, чтобы избежать UnboundLocalError
     asset = None
+    ingested_path: Path | None = None
 
     try:
         if job:
@@ -2051,7 +2312,7 @@ def process_retoucher_job(
             )
             if prompt != provider_prompt:
                 job.meta["provider_prompt"] = provider_prompt
-            job.save_meta()
+            # job.meta сохраняется в Redis один раз - при успехе или ошибке
 
         logger.info(
             "Processing retoucher job {} mode={} instruction={}",
@@ -2065,7 +2326,6 @@ def process_retoucher_job(
             logger.error("Retoucher job {} missing source {}", job_id, image_path)
             if job:
                 job.meta["error"] = error
-                job.save_meta()
             if notify_options.get("chat_id"):
                 _send_failure_notification_sync(notify_options, job_id, error)
             raise RuntimeError(error)
@@ -2078,7 +2338,6 @@ def process_retoucher_job(
             logger.error("Retoucher job {} failed to stat source file: {}", job_id, stat_exc)
             if job:
                 job.meta["error"] = error
-                job.save_meta()
             if notify_options.get("chat_id"):
                 _send_failure_notification_sync(notify_options, job_id, error)
             raise RuntimeError(error)
@@ -2096,7 +2355,6 @@ def process_retoucher_job(
             )
             if job:
                 job.meta["error"] = error
-                job.save_meta()
             if notify_options.get("chat_id"):
                 _send_failure_notification_sync(notify_options, job_id, error)
             raise RuntimeError(error)
@@ -2117,7 +2375,6 @@ def process_retoucher_job(
                        job_id, provider_options.get("num_inference_steps"), provider_options.get("guidance_scale"))
             
             # Используем синхронный режим для nano-banana/edit
-            from app.providers.fal.images import run_image_edit
             try:
                 asset = run_image_edit(
                     image_path=source_file.as_posix(),
@@ -2125,13 +2382,12 @@ def process_retoucher_job(
                     mask_path=None,
                     **provider_options,
                 )
-                logger.info("Retoucher job {}: Got result from synchronous run_image_edit: asset.url={}, asset.content={}", 
-                           job_id, asset.url[:100] if asset.url else "None", asset.content is not None)
+                logger.opt(lazy=True).info("Retoucher job {}: Got result from synchronous run_image_edit: asset.url={}, asset.content={}", 
+                           lambda: job_id, lambda: asset.url[:100] if asset.url else "None", lambda: asset.content is not None)
             except Exception as exc:  # noqa: BLE001
                 logger.error("Retoucher job {} synchronous run_image_edit failed: {}", job_id, exc)
                 if job:
                     job.meta["error"] = str(exc)
-                    job.save_meta()
                 if notify_options.get("chat_id"):
                     _send_failure_notification_sync(notify_options, job_id, f"Ошибка ретуши: {exc}")
                 raise
@@ -2141,11 +2397,11 @@ def process_retoucher_job(
             last_error: Exception | None = None
             for attempt in range(1, RETOUCHER_SUBMIT_MAX_ATTEMPTS + 1):
                 try:
-                    from app.providers.fal.images import submit_image_edit
                     task_id = submit_image_edit(
                         image_path=source_file.as_posix(),
                         prompt=provider_prompt,
                         mask_path=None,
+                        webhook=True,
                         **provider_options,
                     )
                     break
@@ -2168,7 +2424,6 @@ def process_retoucher_job(
                 error_text = "Не удалось отправить запрос на ретушь. Попробуйте позже."
                 if job:
                     job.meta["error"] = str(last_error) if last_error else error_text
-                    job.save_meta()
                 if notify_options.get("chat_id"):
                     _send_failure_notification_sync(notify_options, job_id, error_text)
                 if last_error:
@@ -2176,70 +2431,51 @@ def process_retoucher_job(
                 raise RuntimeError(error_text)
 
             # Для всех остальных моделей используем асинхронный polling
-            from app.providers.fal.images import check_status as check_image_status
-            from app.providers.fal.images import resolve_result_asset as resolve_image_asset
-            
-            # Оптимизированный polling для мягкой ретуши - как у Nano Banana (4 секунды)
-            # Используем тот же интервал, что и для создания изображений для консистентности
-            poll_attempts = 0
-            max_attempts = 45  # 3 минуты при интервале 4 сек (45 * 4 = 180 секунд)
-            poll_interval = 4.0  # Фиксированный интервал 4 секунды (как у Nano Banana)
-            status: dict[str, Any]
-            
-            logger.info("Retoucher job {} polling for task {} completion (interval: {}s, max_attempts: {})", 
-                       job_id, task_id, poll_interval, max_attempts)
-            while True:
-                status = check_image_status(task_id)
-                current_status = status.get("status")
-                
-                # Логируем статус только каждые 5 попыток или при изменении статуса
-                if poll_attempts % 5 == 0 or current_status not in ("processing", "queued", "IN_QUEUE", "IN_PROGRESS"):
-                    logger.debug("Retoucher job {} task {} status: {} (attempt {})", 
-                               job_id, task_id, current_status, poll_attempts + 1)
-
-                if current_status == "succeeded":
-                    logger.info("Retoucher job {} succeeded after {} attempts", job_id, poll_attempts + 1)
-                    break
-                if current_status == "failed":
-                    error = status.get("error", "Unknown error")
-                    logger.error("Retoucher job {} failed: {}", job_id, error)
-                    if job:
-                        job.meta["error"] = error
-                        job.save_meta()
-                    if notify_options.get("chat_id"):
-                        _send_failure_notification_sync(notify_options, job_id, str(error))
-                    raise RuntimeError(error)
-                poll_attempts += 1
-                if poll_attempts >= max_attempts:
-                    error = "Время ожидания ретуши истекло. Попробуйте позже."
-                    logger.error("Retoucher job {} timed out after {} attempts", job_id, poll_attempts)
-                    if job:
-                        job.meta["error"] = error
-                        job.save_meta()
-                    if notify_options.get("chat_id"):
-                        _send_failure_notification_sync(notify_options, job_id, error)
-                    raise RuntimeError(error)
+            # Оптимизированный polling для мягкой ретуши: старт 0.3 с, рост с jitter до 3 с
+            # Async polling: asyncio.sleep + общий httpx.AsyncClient с keep-alive вместо блокирующего цикла
+            poll_timeout = 180.0  # 3 минуты
+            logger.info("Retoucher job {} polling for task {} completion (interval: {}s -> {}s, timeout: {}s)", 
+                       job_id, task_id, FAL_POLL_INITIAL_INTERVAL, FAL_POLL_MAX_INTERVAL, poll_timeout)
+            status, poll_attempts = _poll_task_status(
+                task_id,
+                interval=FAL_POLL_INITIAL_INTERVAL,
+                timeout=poll_timeout,
+                log_prefix=f"Retoucher job {job_id}",
+                max_interval=FAL_POLL_MAX_INTERVAL,
+            )
+            current_status = status.get("status")
 
-                # Фиксированный интервал 4 секунды (как у Nano Banana)
-                time.sleep(poll_interval)
+            if current_status == "failed":
+                error = status.get("error", "Unknown error")
+                logger.error("Retoucher job {} failed: {}", job_id, error)
+                if job:
+                    job.meta["error"] = error
+                if notify_options.get("chat_id"):
+                    _send_failure_notification_sync(notify_options, job_id, str(error))
+                raise RuntimeError(error)
+            if current_status != "succeeded":
+                error = "Время ожидания ретуши истекло. Попробуйте позже."
+                logger.error("Retoucher job {} timed out after {} attempts", job_id, poll_attempts)
+                if job:
+                    job.meta["error"] = error
+                if notify_options.get("chat_id"):
+                    _send_failure_notification_sync(notify_options, job_id, error)
+                raise RuntimeError(error)
+            logger.info("Retoucher job {} succeeded after {} attempts", job_id, poll_attempts)
 
             # Получаем результат после завершения
-            from app.providers.fal.images import _extract_image_url as extract_image_url
-            status_image_url = extract_image_url(status)
+            status_image_url = _extract_image_url(status)
             asset = None
 
             if status_image_url:
                 # Проверяем формат URL
-                if status_image_url.startswith("data:"):
+                url_kind = _result_url_kind(status_image_url)
+                if url_kind == "data":
                     logger.info("Retoucher job {} result found in status response (data URL)", job_id)
-                    from app.providers.fal.images import ImageAsset
-                    import base64
-                    header, _, data_part = status_image_url.partition(",")
-                    content = base64.b64decode(data_part)
+                    content, ingested_path = _ingest_data_url(status_image_url, output_file)
                     asset = ImageAsset(url=None, content=content, filename="retouch.png")
-                elif status_image_url.startswith("http") and not (status_image_url.startswith("https://queue.fal.run") or status_image_url.startswith("http://queue.fal.run")):
+                elif url_kind == "http":
                     logger.info("Retoucher job {} result found in status response (direct URL): {}", job_id, status_image_url[:100])
-                    from app.providers.fal.images import ImageAsset
                     asset = ImageAsset(url=status_image_url, content=None, filename=None)
 
             # Если результат не в статусе, получаем через result_url или response_url
@@ -2250,25 +2486,20 @@ def process_retoucher_job(
                     logger.error("Retoucher job {} task {} completed without result URL or result in status", job_id, task_id)
                     if job:
                         job.meta["error"] = error
-                        job.save_meta()
                     if notify_options.get("chat_id"):
                         _send_failure_notification_sync(notify_options, job_id, error)
                     raise RuntimeError(error)
 
-                # Короткая задержка после завершения, чтобы API успел подготовить результат (как в Smart Merge)
-                time.sleep(0.5)
-                
-                # Получаем результат одним быстрым вызовом (как в Smart Merge), без повторных попыток
+                # Без фиксированной паузы: повтор с коротким backoff только если результат еще не готов
                 try:
-                    asset = resolve_image_asset(result_url)
-                    logger.info("Retoucher job {} successfully got result: asset.url={}, asset.content={}", 
-                               job_id, asset.url[:100] if asset.url else "None", asset.content is not None)
+                    asset = _resolve_result_when_ready(result_url, job_id, "Retoucher job")
+                    logger.opt(lazy=True).info("Retoucher job {} successfully got result: asset.url={}, asset.content={}", 
+                               lambda: job_id, lambda: asset.url[:100] if asset.url else "None", lambda: asset.content is not None)
                 except Exception as exc:  # noqa: BLE001
                     error = f"Не удалось получить результат ретуши: {exc}"
                     logger.error("Retoucher job {} failed to get result: {}", job_id, exc)
                     if job:
                         job.meta["error"] = str(exc)
-                        job.save_meta()
                     if notify_options.get("chat_id"):
                         _send_failure_notification_sync(notify_options, job_id, error)
                     raise RuntimeError(error)
@@ -2279,7 +2510,6 @@ def process_retoucher_job(
             logger.error("Retoucher job {}: asset is None after processing", job_id)
             if job:
                 job.meta["error"] = error
-                job.save_meta()
             if notify_options.get("chat_id"):
                 _send_failure_notification_sync(notify_options, job_id, error)
             raise RuntimeError(error)
@@ -2291,7 +2521,8 @@ def process_retoucher_job(
         image_url = asset.url
         image_bytes = asset.content
         filename = asset.filename
-        saved_path = None
+        # Крупный data: URL уже сохранен на диск в _ingest_data_url - повторная запись не нужна
+        saved_path = ingested_path
         
         if is_soft_mode:
             # Асинхронный режим для мягкой ретуши - точно как у Nano Banana Smart Merge
@@ -2309,18 +2540,10 @@ def process_retoucher_job(
                 # НЕ планируем фоновое скачивание - это замедляет выполнение
                 # Фоновое скачивание занимает время и не нужно для немедленной отправки
         else:
-            # Синхронный режим для enhance - скачиваем файл перед отправкой
-            if image_bytes is not None:
+            # Синхронный режим для enhance - сохраняем из памяти или скачиваем по URL перед отправкой
+            if image_bytes is not None or image_url:
                 saved_path = _persist_asset(asset, output_file.as_posix())
-            elif image_url:
-                # Если есть только URL, скачиваем синхронно
-                saved_path = _persist_asset(asset, output_file.as_posix())
-                if saved_path and saved_path.exists():
-                    try:
-                        image_bytes = saved_path.read_bytes()
-                        filename = filename or saved_path.name
-                    except Exception as read_exc:  # noqa: BLE001
-                        logger.warning("Failed to read saved retouch result {} (enhance mode): {}", saved_path, read_exc)
+                # Если был только URL, уведомление отправит скачанный файл (см. ветку saved_path ниже)
 
         if job:
             if image_url:
@@ -2357,16 +2580,14 @@ def process_retoucher_job(
                         caption_title=caption_title,
                         reply_markup=reply_markup,
                     )
-                elif saved_path and saved_path.exists():
+                elif saved_path:
                     # Используем уже скачанный файл вместо повторного скачивания
-                    logger.info("Using already downloaded file for notification: {} (size: {:.2f} KB)", 
-                               saved_path, saved_path.stat().st_size / 1024)
-                    with open(saved_path, "rb") as f:
-                        image_bytes = f.read()
+                    # (путь от _persist_asset существует; путь из job.meta проверен выше)
+                    logger.info("Using already downloaded file for notification: {}", saved_path)
                     _send_success_notification_sync(
                         notify_options,
                         job_id,
-                        image_bytes=image_bytes,
+                        image_path=saved_path,
                         filename=filename or saved_path.name,
                         caption_title=caption_title,
                         reply_markup=reply_markup,
@@ -2387,23 +2608,10 @@ def process_retoucher_job(
             except Exception as notify_error:  # noqa: BLE001
                 logger.error("Failed to send Telegram notification for retoucher job {}: {}", job_id, notify_error, exc_info=True)
 
-        logger.info("Retoucher job {} completed successfully", job_id)
-        
         # Confirm operation after successful completion
-        if operation_id:
-            from app.db.base import SessionLocal
-            from app.services.billing import BillingService
-            db = SessionLocal()
-            try:
-                success = BillingService.confirm_operation(db, operation_id)
-                if success:
-                    logger.info("Confirmed operation {} for retoucher job {}", operation_id, job_id)
-                else:
-                    logger.error("Failed to confirm operation {} for retoucher job {}", operation_id, job_id)
-            except Exception as e:
-                logger.error("Error confirming operation {} for retoucher job {}: {}", operation_id, job_id, e, exc_info=True)
-            finally:
-                db.close()
+        _billing_confirm(operation_id, job_id, "retoucher job")
+
+        logger.info("Retoucher job {} completed successfully", job_id)
         
         return {
             "image_url": image_url,
@@ -2411,34 +2619,22 @@ def process_retoucher_job(
             "filename": filename,
             "saved_path": saved_path.as_posix() if saved_path else None,
         }
-
-        return caption_path
     except JobTimeoutException as timeout_exc:
         # Обработка таймаута задачи - отправляем уведомление пользователю
         logger.error("Retoucher job {} timed out after 4 minutes", job_id)
         _handle_job_timeout(job_id, notify_options, "ретуши")
+        if job:
+            job.meta["error"] = "timeout"
+            job.save_meta()
         # Mark operation as failed
-        if operation_id:
-            db = SessionLocal()
-            try:
-                BillingService.fail_operation(db, operation_id)
-                logger.info("Marked operation {} as failed for retoucher job {} due to timeout", operation_id, job_id)
-            except Exception as fail_error:
-                logger.error("Error failing operation {} for retoucher job {}: {}", operation_id, job_id, fail_error, exc_info=True)
-            finally:
-                db.close()
+        _billing_fail(operation_id, job_id, "retoucher job", "timeout")
         raise
     except Exception as e:
-                    # Mark operation as failed on any error
-        if operation_id:
-            db = SessionLocal()
-            try:
-                BillingService.fail_operation(db, operation_id)
-                logger.info("Marked operation {} as failed for retoucher job {} due to error", operation_id, job_id)
-            except Exception as fail_error:
-                logger.error("Error failing operation {} for retoucher job {}: {}", operation_id, job_id, fail_error, exc_info=True)
-            finally:
-                db.close()
+        if job:
+            job.meta.setdefault("error", str(e))
+            job.save_meta()
+        # Mark operation as failed on any error
+        _billing_fail(operation_id, job_id, "retoucher job")
         raise
 
 
@@ -2451,8 +2647,6 @@ def process_smart_merge_job(
 ) -> str:
     # Import models to ensure they are registered with Base.metadata
     from app.db import models  # noqa: F401
-    from app.services.billing import BillingService
-    from app.db.base import SessionLocal
 
     if not image_sources:
         raise ValueError("Smart merge requires at least one image source")
@@ -2499,9 +2693,9 @@ def process_smart_merge_job(
     # ВРЕМЕННО ОТКЛЮЧЕНО: Flux 2 Pro Edit - проблемы с размерами изображений
     model_name = provider_options.get("model", "")
     logger.info("Smart merge job {}: Processing with model='{}', image_sources count={}", job_id, model_name, len(image_sources) if image_sources else 0)
-    is_nano_banana_regular = model_name == SMART_MERGE_DEFAULT_MODEL or model_name == "fal-ai/nano-banana" or ("nano-banana" in model_name.lower() and "pro" not in model_name.lower())
-    is_nano_banana_pro = "nano-banana-pro" in model_name.lower()
-    is_nano_banana = is_nano_banana_regular or is_nano_banana_pro
+    quality_profile = _quality_profile_key(model_name)
+    is_nano_banana_pro = quality_profile == "nano-banana-pro"
+    is_nano_banana = quality_profile in ("nano-banana", "nano-banana-pro")
     # is_flux2pro = "flux-2-pro" in model_name.lower() and "/edit" in model_name.lower()
     # 
     # # Логируем детали для Flux 2 Pro
@@ -2516,47 +2710,8 @@ def process_smart_merge_job(
         provider_prompt = prompt  # Используем оригинальный промпт без перевода
     
     # Применяем настройки качества для nano-banana (обычный и pro) и seedream в Smart Merge
-    is_seedream = "seedream" in model_name.lower()
-    
-    if is_nano_banana_regular:
-        # Увеличиваем параметры качества для максимального результата (обычный nano-banana)
-        provider_options["num_inference_steps"] = 90
-        provider_options["guidance_scale"] = 11.0
-        logger.info("Smart merge job {}: Applied quality settings for nano-banana: num_inference_steps={}, guidance_scale={}", 
-                   job_id, provider_options.get("num_inference_steps"), provider_options.get("guidance_scale"))
-    elif is_nano_banana_pro:
-        # Не перезаписываем параметры, если они уже установлены (например, из бота с оптимизированными значениями)
-        # Используем значения по умолчанию только если они не были переданы
-        if "num_inference_steps" not in provider_options:
-            provider_options["num_inference_steps"] = 100  # Оптимизированное значение вместо 55
-        if "guidance_scale" not in provider_options:
-            provider_options["guidance_scale"] = 11.0  # Оптимизированное значение вместо 8.5
-        logger.info("Smart merge job {}: Using parameters for nano-banana-pro: num_inference_steps={}, guidance_scale={}", 
-                   job_id, provider_options.get("num_inference_steps"), provider_options.get("guidance_scale"))
-    # ВРЕМЕННО ОТКЛЮЧЕНО: Flux 2 Pro Edit - проблемы с размерами изображений
-    # elif is_flux2pro:
-    #     # Применяем улучшенные настройки качества для Flux 2 Pro Edit
-    #     # Flux 2 Pro поддерживает multi-reference editing (до 6 референсов), поэтому важно правильно передать image_urls
-    #     if "num_inference_steps" not in provider_options:
-    #         provider_options["num_inference_steps"] = 100  # Увеличено до 100 для максимального качества и сходства с референсом
-    #     if "guidance_scale" not in provider_options:
-    #         provider_options["guidance_scale"] = 7.5  # Увеличено до 7.5 для максимального следования промпту и референсам
-    #     # Логируем размеры для проверки
-    #     logger.info("Smart merge job {}: Applied enhanced quality settings for Flux 2 Pro Edit: num_inference_steps={}, guidance_scale={}, image_sources count={}, width={}, height={}, size={}", 
-    #                job_id, provider_options.get("num_inference_steps"), provider_options.get("guidance_scale"), 
-    #                len(image_sources) if image_sources else 0, provider_options.get("width"), provider_options.get("height"), provider_options.get("size"))
-    elif is_seedream:
-        # Оптимизированные настройки для Seedream (баланс качества и естественности)
-        # Исправлено: снижены параметры для предотвращения артефактов
-        provider_options["num_inference_steps"] = 60
-        provider_options["guidance_scale"] = 7.5
-        provider_options["enhance_prompt_mode"] = "fast"  # Быстрый режим для более естественной интерпретации
-        # Добавляем negative_prompt для избежания неестественных эффектов (если не задан)
-        if "negative_prompt" not in provider_options:
-            provider_options["negative_prompt"] = "glowing eyes, neon eyes, glowing green eyes, unnatural eye colors, eye glow, glowing effects on eyes, artifacts, distorted features, oversaturated, unrealistic lighting, glowing skin, neon effects"
-        logger.info("Smart merge job {}: Applied optimized quality settings for Seedream: num_inference_steps={}, guidance_scale={}, enhance_prompt_mode={}, negative_prompt={}", 
-                   job_id, provider_options.get("num_inference_steps"), provider_options.get("guidance_scale"), 
-                   provider_options.get("enhance_prompt_mode"), provider_options.get("negative_prompt")[:50] if provider_options.get("negative_prompt") else None)
+    # ВРЕМЕННО ОТКЛЮЧЕНО: Flux 2 Pro Edit - профиль качества не применяется
+    _SMART_MERGE_QUALITY_PROFILES.get(quality_profile, _apply_no_quality_profile)(provider_options, job_id)
 
     notify_options = _extract_notify_options(provider_options)
     output_file = Path(output_path)
@@ -2572,9 +2727,9 @@ def process_smart_merge_job(
                     "sources": image_sources,
                 }
             )
-        if provider_prompt != prompt:
-            job.meta["provider_prompt"] = provider_prompt
-        job.save_meta()
+            if provider_prompt != prompt:
+                job.meta["provider_prompt"] = provider_prompt
+            # job.meta сохраняется в Redis один раз - при успехе или ошибке
 
         logger.info(
             "Processing smart merge job {} with {} images, prompt='{}', provider_prompt='{}'",
@@ -2587,30 +2742,17 @@ def process_smart_merge_job(
         # Для nano-banana/edit, nano-banana-pro/edit, flux-2-pro/edit и seedream/edit используем асинхронный режим через queue API
         # чтобы не блокировать worker'ы при высокой нагрузке
         model_name = provider_options.get("model", "")
-        is_nano_banana_edit = "nano-banana" in model_name.lower() and "/edit" in model_name.lower() and "pro" not in model_name.lower()
-        is_nano_banana_pro_edit = "nano-banana-pro" in model_name.lower() and "/edit" in model_name.lower()
-        is_flux2pro_edit = "flux-2-pro" in model_name.lower() and "/edit" in model_name.lower()
-        is_seedream_edit = "seedream" in model_name.lower() and "/edit" in model_name.lower()
+        queue_label = _smart_merge_queue_label(model_name)
         
-        if is_nano_banana_edit or is_nano_banana_pro_edit or is_flux2pro_edit or is_seedream_edit:
+        if queue_label:
             # Используем асинхронный режим для nano-banana/edit, nano-banana-pro/edit и seedream/edit
-            from app.providers.fal.images import submit_smart_merge
-            from app.providers.fal.images import check_status as check_image_status
-            from app.providers.fal.images import resolve_result_asset as resolve_image_asset
-            from app.providers.fal import images as fal_images
-            
-            if is_nano_banana_pro_edit:
-                logger.info("Smart merge job {}: Using asynchronous queue mode for nano-banana-pro/edit", job_id)
-            elif is_flux2pro_edit:
-                logger.info("Smart merge job {}: Using asynchronous queue mode for flux-2-pro/edit", job_id)
-            elif is_seedream_edit:
-                logger.info("Smart merge job {}: Using asynchronous queue mode for seedream/edit", job_id)
-            else:
-                logger.info("Smart merge job {}: Using asynchronous queue mode for nano-banana/edit", job_id)
+
+            logger.info("Smart merge job {}: Using asynchronous queue mode for {}", job_id, queue_label)
             try:
                 task_id = submit_smart_merge(
                     image_sources=image_sources,
                     prompt=provider_prompt,
+                    webhook=True,
                     **provider_options,
                 )
                 
@@ -2625,14 +2767,13 @@ def process_smart_merge_job(
                     status_from_response = queue_response.get("status")
                     if status_from_response == "COMPLETED" or status_from_response == "succeeded":
                         # Пытаемся извлечь URL из ответа
-                        from app.providers.fal.images import _extract_image_url
                         result_url = _extract_image_url(queue_response)
                         if result_url:
                             logger.info("Smart merge job {}: Got result URL immediately from queue_response", job_id)
                             # Используем resolve_result_asset для получения финального URL
                             asset = resolve_image_asset(result_url)
-                            logger.info("Smart merge job {} successfully got result: asset.url={}, asset.content={}", 
-                                       job_id, asset.url[:100] if asset.url else "None", asset.content is not None)
+                            logger.opt(lazy=True).info("Smart merge job {} successfully got result: asset.url={}, asset.content={}", 
+                                       lambda: job_id, lambda: asset.url[:100] if asset.url else "None", lambda: asset.content is not None)
                             # Пропускаем polling и переходим к сохранению результата
                             image_url = asset.url
                             image_bytes = asset.content
@@ -2661,27 +2802,15 @@ def process_smart_merge_job(
                             if notify_options.get("chat_id"):
                                 _send_success_notification_sync(notify_options, job_id, image_url, image_bytes, filename)
                             
-                            if job:
-                                operation_id = notify_options.get("operation_id")
-                                if operation_id:
-                                    from app.services.billing import BillingService
-                                    from app.db.base import SessionLocal
-                                    db = SessionLocal()
-                                    try:
-                                        BillingService.confirm_operation(db, operation_id)
-                                        logger.info("Confirmed operation {} for smart merge job {}", operation_id, job_id)
-                                    finally:
-                                        db.close()
-                            
+                            _billing_confirm(operation_id, job_id, "smart merge job")
                             return
                 
                 # Если результат не получен сразу, начинаем polling
                 logger.info("Smart merge job {}: Result not available immediately, starting polling for task {}", job_id, task_id)
                 poll_attempts = 0
-                max_attempts = 150  # Уменьшено с 180 до 150 (при 60 шагах генерация быстрее)
-                poll_interval = 2.0  # Уменьшено с 3.0 до 2.0 секунд для более быстрого обнаружения завершения
-                max_interval = 6.0  # Уменьшено с 8.0 до 6.0 секунд
-                consecutive_progress = 0  # Счетчик последовательных проверок со статусом "IN_PROGRESS"
+                poll_timeout = 240.0  # Бюджет по времени (4 минуты), не зависит от роста интервала
+                poll_deadline = time.monotonic() + poll_timeout
+                poll_interval = FAL_POLL_INITIAL_INTERVAL  # Старт 0.3 с, рост с jitter до 3 с
                 
                 logger.info("Smart merge job {} polling for task {} completion", job_id, task_id)
                 while True:
@@ -2700,36 +2829,24 @@ def process_smart_merge_job(
                         logger.error("Smart merge job {} task {} failed: {}", job_id, task_id, error)
                         if job:
                             job.meta["error"] = error
-                            job.save_meta()
                         if notify_options.get("chat_id"):
                             _send_failure_notification_sync(notify_options, job_id, f"Редактирование не удалось: {error}")
                         raise RuntimeError(error)
                     
                     poll_attempts += 1
-                    if poll_attempts >= max_attempts:
+                    remaining = poll_deadline - time.monotonic()
+                    if remaining <= 0:
                         error = "Редактирование превысило время ожидания"
-                        logger.error("Smart merge job {} task {} timed out after {} attempts", job_id, task_id, poll_attempts)
+                        logger.error("Smart merge job {} task {} timed out after {:.0f}s ({} attempts)",
+                                     job_id, task_id, poll_timeout, poll_attempts)
                         if job:
                             job.meta["error"] = error
-                            job.save_meta()
                         if notify_options.get("chat_id"):
                             _send_failure_notification_sync(notify_options, job_id, "Задача превысила время ожидания. Попробуйте позже.")
                         raise RuntimeError(error)
                     
-                    # Адаптивное увеличение интервала: если статус долго "IN_PROGRESS", увеличиваем интервал быстрее
-                    if current_status in ("IN_PROGRESS", "processing"):
-                        consecutive_progress += 1
-                        # После 5 последовательных проверок "IN_PROGRESS" начинаем увеличивать интервал быстрее
-                        if consecutive_progress > 5:
-                            poll_interval = min(poll_interval * 1.15, max_interval)
-                        else:
-                            poll_interval = min(poll_interval * 1.08, max_interval)
-                    else:
-                        consecutive_progress = 0
-                        # Если статус изменился (например, "IN_QUEUE"), увеличиваем интервал медленнее
-                        poll_interval = min(poll_interval * 1.05, max_interval)
-                    
-                    time.sleep(poll_interval)
+                    _sleep_until_fal_done(task_id, min(poll_interval, remaining))
+                    poll_interval = _next_backoff(poll_interval, base=FAL_POLL_INITIAL_INTERVAL, cap=FAL_POLL_MAX_INTERVAL)
                 
                 # Получаем результат
                 result_url = status.get("result_url") or status.get("response_url")
@@ -2738,20 +2855,17 @@ def process_smart_merge_job(
                     logger.error("Smart merge job {} task {} completed without result URL", job_id, task_id)
                     if job:
                         job.meta["error"] = error
-                        job.save_meta()
                     if notify_options.get("chat_id"):
                         _send_failure_notification_sync(notify_options, job_id, error)
                     raise RuntimeError(error)
                 
-                time.sleep(0.5)
-                asset = resolve_image_asset(result_url)
-                logger.info("Smart merge job {} successfully got result: asset.url={}, asset.content={}", 
-                           job_id, asset.url[:100] if asset.url else "None", asset.content is not None)
+                asset = _resolve_result_when_ready(result_url, job_id, "Smart merge job")
+                logger.opt(lazy=True).info("Smart merge job {} successfully got result: asset.url={}, asset.content={}", 
+                           lambda: job_id, lambda: asset.url[:100] if asset.url else "None", lambda: asset.content is not None)
             except Exception as exc:  # noqa: BLE001
                 logger.error("Smart merge job {} asynchronous mode failed: {}", job_id, exc)
                 if job:
                     job.meta["error"] = str(exc)
-                    job.save_meta()
                 if notify_options.get("chat_id"):
                     _send_failure_notification_sync(notify_options, job_id, f"Ошибка редактирования: {exc}")
                 raise
@@ -2767,7 +2881,6 @@ def process_smart_merge_job(
                 logger.error("Smart merge job {} failed: {}", job_id, exc)
                 if job:
                     job.meta["error"] = str(exc)
-                    job.save_meta()
                 if notify_options.get("chat_id"):
                     failure_text = "Сервис временно недоступен, попробуйте позже."
                     if isinstance(exc, ValueError):
@@ -2837,49 +2950,62 @@ def process_smart_merge_job(
                 logger.error("Failed to send Telegram notification for smart merge job {}: {}", job_id, notify_error)
 
         # Confirm operation after successful completion
-        if operation_id:
-            db = SessionLocal()
-            try:
-                success = BillingService.confirm_operation(db, operation_id)
-                if success:
-                    logger.info("Confirmed operation {} for smart merge job {}", operation_id, job_id)
-                else:
-                    logger.error("Failed to confirm operation {} for smart merge job {}", operation_id, job_id)
-            except Exception as e:
-                logger.error("Error confirming operation {} for smart merge job {}: {}", operation_id, job_id, e, exc_info=True)
-            finally:
-                db.close()
+        _billing_confirm(operation_id, job_id, "smart merge job")
 
         return image_url or ""
     except JobTimeoutException as timeout_exc:
         # Обработка таймаута задачи - отправляем уведомление пользователю
         logger.error("Smart merge job {} timed out after 4 minutes", job_id)
         _handle_job_timeout(job_id, notify_options, "объединения изображений")
-        # Mark operation as failed
-        if operation_id:
-            db = SessionLocal()
-            try:
-                BillingService.fail_operation(db, operation_id)
-                logger.info("Marked operation {} as failed for smart merge job {} due to timeout", operation_id, job_id)
-            except Exception as fail_error:
-                logger.error("Error failing operation {} for smart merge job {}: {}", operation_id, job_id, fail_error, exc_info=True)
-            finally:
-                db.close()
+        if job:
+            job.meta["error"] = "timeout"
+            job.save_meta()
+        _billing_fail(operation_id, job_id, "smart merge job", "timeout")
         raise
     except Exception as e:
+        if job:
+            job.meta.setdefault("error", str(e))
+            job.save_meta()
         # Mark operation as failed on any error
-        if operation_id:
-            db = SessionLocal()
-            try:
-                BillingService.fail_operation(db, operation_id)
-                logger.info("Marked operation {} as failed for smart merge job {} due to error", operation_id, job_id)
-            except Exception as fail_error:
-                logger.error("Error failing operation {} for smart merge job {}: {}", operation_id, job_id, fail_error, exc_info=True)
-            finally:
-                db.close()
+        _billing_fail(operation_id, job_id, "smart merge job")
         raise
 
 
+def _is_upscale_input_ready(image: Image.Image, path: Path) -> bool:
+    """Можно ли отправить исходный файл апскейла без перекодирования (MIME определяется по расширению)."""
+    suffixes = UPSCALE_PASSTHROUGH_FORMATS.get(image.format or "")
+    return bool(suffixes) and path.suffix.lower() in suffixes and image.mode in UPSCALE_PASSTHROUGH_MODES
+
+
+def _fetch_upscale_result(result_url: str, job_id: str) -> ImageAsset:
+    """
+    Один запрос queue_result дает и file_size (для логов), и URL изображения.
+    resolve_image_asset вызывается, только если прямого URL в ответе нет.
+    """
+    parsed = _parse_result_url(result_url)
+    if parsed:
+        model_path, request_id = parsed
+        try:
+            response_data = queue_result(model_path, request_id)
+        except Exception as queue_exc:  # noqa: BLE001
+            logger.debug("Upscale job {}: queue_result failed, falling back to resolve_image_asset: {}", job_id, queue_exc)
+            response_data = None
+        if isinstance(response_data, dict):
+            # Check common structures: {'image': {'file_size': ...}} or {'file_size': ...}
+            image_info = response_data.get("image")
+            api_file_size = image_info.get("file_size") if isinstance(image_info, dict) else response_data.get("file_size")
+            if api_file_size:
+                logger.info("Upscale job {}: extracted file_size {} bytes ({:.2f}MB) from API response",
+                           job_id, api_file_size, api_file_size / (1024 * 1024))
+            image_url = _extract_image_url(response_data)
+            url_kind = _result_url_kind(image_url) if image_url else None
+            if url_kind == "http":
+                return ImageAsset(url=image_url, content=None, filename=None)
+            if url_kind == "data":
+                return ImageAsset(url=None, content=_decode_data_url(image_url), filename="upscale.png")
+    return _resolve_to_direct_url(result_url, job_id, "Upscale job")
+
+
 def process_image_upscale_job(
     job_id: str,
     image_url: str | None,
@@ -2890,8 +3016,6 @@ def process_image_upscale_job(
 ) -> str:
     # Import models to ensure they are registered with Base.metadata
     from app.db import models  # noqa: F401
-    from app.services.billing import BillingService
-    from app.db.base import SessionLocal
 
     provider_options: Dict[str, Any] = dict(options or {})
     operation_id_raw = provider_options.pop("operation_id", None)
@@ -2917,14 +3041,17 @@ def process_image_upscale_job(
                     "source_url": image_url,
                     "scale": scale_value,
                     "model": model_name,
+                    # Очередь, из которой взята задача - для разбора задержек по моделям
+                    "queue": job.origin,
                 }
             )
-            job.save_meta()
+            # job.meta сохраняется в Redis после отправки задачи и при завершении (успех или ошибка)
     except Exception:
         pass  # Ignore errors in job meta update
 
+    # Временные файлы (скачанный исходник, PNG после конвертации) удаляются в finally на любом исходе
+    cleanup_paths: list[Path] = []
     try:
-        cleanup_paths: list[Path] = []
         local_input_path: Path | None = None
         input_dimensions = None
         if image_path:
@@ -2948,386 +3075,312 @@ def process_image_upscale_job(
                     tmp_path.unlink(missing_ok=True)
                 raise
 
+        # Тот же исходник с той же моделью и масштабом уже обрабатывался - берем результат из Redis
+        cache_key: str | None = None
+        asset = None
         if local_input_path:
             try:
-                with Image.open(local_input_path) as input_image:
-                    prepared = input_image.convert("RGB")
-                    max_edge = max(prepared.size)
-                    original_input_size = f"{prepared.width}x{prepared.height}"
-                    # Don't reduce input size - let the model handle it
-                    # The model should accept images up to reasonable size
-                    # Only log if we would have reduced it
-                    if max_edge > UPSCALE_INPUT_MAX_EDGE:
-                        logger.info(
-                            "Upscale job {}: input image {}x{} exceeds {}px limit, but sending as-is (model should handle it)",
-                            job_id,
-                            prepared.width,
-                            prepared.height,
-                            UPSCALE_INPUT_MAX_EDGE,
-                        )
-                    else:
-                        # Calculate input file size
-                        input_file_size = local_input_path.stat().st_size / (1024 * 1024)
-                        logger.info(
-                            "Upscale job {}: input image size {}x{} (file size: {:.2f}MB, format: PNG)",
-                            job_id,
-                            prepared.width,
-                            prepared.height,
-                            input_file_size,
-                        )
-                    fd, png_name = tempfile.mkstemp(suffix=".png")
-                    os.close(fd)
-                    png_path = Path(png_name)
-                    prepared.save(png_path.as_posix(), "PNG", optimize=True)
-                    cleanup_paths.append(png_path)
-                    local_input_path = png_path
-                    input_dimensions = original_input_size
-            except Exception as prepare_exc:  # noqa: BLE001
-                logger.warning("Failed to preprocess upscale input for job {}: {}", job_id, prepare_exc)
-
-        # Log input image dimensions
-        if input_dimensions is None and local_input_path and local_input_path.exists():
-            try:
-                with Image.open(local_input_path) as img:
-                    input_dimensions = f"{img.width}x{img.height}"
-            except Exception:
-                pass
+                cache_key = upscale_cache_key(local_input_path, model_name, scale_value)
+                cached = get_cached_upscale(cache_key)
+                if cached and cached.get("url"):
+                    asset = ImageAsset(url=cached["url"], content=None, filename=cached.get("filename"))
+                    logger.info("Upscale job {}: cache hit {}, skipping fal.ai request", job_id, cache_key)
+            except Exception as cache_exc:  # noqa: BLE001
+                logger.warning("Upscale job {}: result cache lookup failed: {}", job_id, cache_exc)
 
-        logger.info(
-            "Processing image upscale job {} for url={}, path={} (scale={}, input_size={})",
-            job_id,
-            image_url,
-            image_path,
-            scale_value,
-            input_dimensions or "unknown",
-        )
+        if asset is None:
+            if local_input_path:
+                try:
+                    with Image.open(local_input_path) as input_image:
+                        width, height = input_image.size
+                        max_edge = max(width, height)
+                        input_dimensions = f"{width}x{height}"
+                        # Don't reduce input size - let the model handle it
+                        # The model should accept images up to reasonable size
+                        # Only log if we would have reduced it
+                        if max_edge > UPSCALE_INPUT_MAX_EDGE:
+                            logger.info(
+                                "Upscale job {}: input image {}x{} exceeds {}px limit, but sending as-is (model should handle it)",
+                                job_id,
+                                width,
+                                height,
+                                UPSCALE_INPUT_MAX_EDGE,
+                            )
+                        else:
+                            # Calculate input file size
+                            input_file_size = local_input_path.stat().st_size / (1024 * 1024)
+                            logger.info(
+                                "Upscale job {}: input image size {}x{} (file size: {:.2f}MB, format: {})",
+                                job_id,
+                                width,
+                                height,
+                                input_file_size,
+                                input_image.format,
+                            )
+                        # Готовый PNG/JPEG в RGB с подходящим расширением отправляем как есть - без декодирования и
+                        # повторного кодирования; иначе конвертируем в PNG с быстрым сжатием (без optimize)
+                        if not _is_upscale_input_ready(input_image, local_input_path):
+                            fd, png_name = tempfile.mkstemp(suffix=".png")
+                            os.close(fd)
+                            png_path = Path(png_name)
+                            input_image.convert("RGB").save(png_path.as_posix(), "PNG", compress_level=UPSCALE_PNG_COMPRESS_LEVEL)
+                            cleanup_paths.append(png_path)
+                            local_input_path = png_path
+                except Exception as prepare_exc:  # noqa: BLE001
+                    logger.warning("Failed to preprocess upscale input for job {}: {}", job_id, prepare_exc)
+
+            logger.info(
+                "Processing image upscale job {} for url={}, path={} (scale={}, input_size={})",
+                job_id,
+                image_url,
+                image_path,
+                scale_value,
+                input_dimensions or "unknown",
+            )
 
-        if local_input_path is None:
-            error = "Не удалось подготовить изображение для апскейла."
-            logger.error("Upscale job {} missing source image (url={}, path={})", job_id, image_url, image_path)
-            if job:
-                job.meta["error"] = error
-                job.save_meta()
-            if notify_options.get("chat_id"):
-                _send_failure_notification_sync(notify_options, job_id, error)
-            raise RuntimeError(error)
+            if local_input_path is None:
+                error = "Не удалось подготовить изображение для апскейла."
+                logger.error("Upscale job {} missing source image (url={}, path={})", job_id, image_url, image_path)
+                if job:
+                    job.meta["error"] = error
+                if notify_options.get("chat_id"):
+                    _send_failure_notification_sync(notify_options, job_id, error)
+                raise RuntimeError(error)
 
-        # Use queue API for more reliable processing (async approach like face swap)
-        attempts = 0
-        delay = UPSCALE_RETRY_BASE_DELAY
-        last_error: Exception | None = None
-        task_id: str | None = None
-        used_model = model_name
-
-        # Add parameters to control output format - request JPEG format with quality for file size control
-        upscale_options = dict(provider_options)
-        # Request PNG format for all upscale models
-        # Note: Some models may not support output_format parameter, but we try anyway
-        if model_name in ("fal-ai/recraft/upscale/crisp", "fal-ai/recraft/upscale/creative", "fal-ai/esrgan"):
-            # Request PNG format
-            upscale_options.setdefault("output_format", "png")
-            logger.info("Upscale job {}: requesting PNG output format for model {}", 
-                       job_id, model_name)
-
-        # Try primary model first
-        while attempts < UPSCALE_MAX_ATTEMPTS:
-            try:
-                logger.info("Upscale job {}: calling submit_image_upscale with upscale_options: {}", 
-                           job_id, {k: v for k, v in upscale_options.items() if not k.startswith("notify_") and not k.startswith("source_")})
-                task_id = submit_image_upscale(
-                    image_url=None,
-                    image_path=local_input_path.as_posix() if local_input_path else None,
-                    scale=scale_value,
-                    model=model_name,
-                    **upscale_options,
-                )
-                logger.info("Upscale job {} submitted to queue with task_id: {} (model: {})", job_id, task_id, model_name)
-                break
-            except Exception as exc:  # noqa: BLE001
-                last_error = exc
-                attempts += 1
-                logger.info("Upscale job {} submit attempt {} caught exception: {} ({})", 
-                           job_id, attempts, type(exc).__name__, exc)
-                is_retryable = _is_retryable_error(exc)
-                logger.info("Upscale job {} submit attempt {}: is_retryable={}, attempts_left={}", 
-                           job_id, attempts, is_retryable, UPSCALE_MAX_ATTEMPTS - attempts)
-                if is_retryable and attempts < UPSCALE_MAX_ATTEMPTS:
-                    error_type = "network/server" if isinstance(exc, (httpx.RequestError, httpx.HTTPStatusError)) else "error"
-                    logger.warning(
-                        "Upscale job {} submit attempt {} failed due to {} issue: {}. Retrying in {:.1f}s",
-                        job_id,
-                        attempts,
-                        error_type,
-                        exc,
-                        delay,
+            # Use queue API for more reliable processing (async approach like face swap)
+            attempts = 0
+            delay = UPSCALE_RETRY_BASE_DELAY
+            last_error: Exception | None = None
+            task_id: str | None = None
+            used_model = model_name
+
+            # Add parameters to control output format - request JPEG format with quality for file size control
+            upscale_options = dict(provider_options)
+            # Request PNG format for all upscale models
+            # Note: Some models may not support output_format parameter, but we try anyway
+            if model_name in ("fal-ai/recraft/upscale/crisp", "fal-ai/recraft/upscale/creative", "fal-ai/esrgan"):
+                # Request PNG format
+                upscale_options.setdefault("output_format", "png")
+                logger.info("Upscale job {}: requesting PNG output format for model {}", 
+                           job_id, model_name)
+
+            # Опции для логов без notify_/source_ полей - один раз до цикла ретраев
+            redacted_options = {k: v for k, v in upscale_options.items() if not k.startswith(("notify_", "source_"))}
+
+            # Try primary model first
+            while attempts < UPSCALE_MAX_ATTEMPTS:
+                try:
+                    logger.opt(lazy=True).info("Upscale job {}: calling submit_image_upscale with upscale_options: {}",
+                                               lambda: job_id, lambda: redacted_options)
+                    task_id = submit_image_upscale(
+                        image_url=None,
+                        image_path=local_input_path.as_posix() if local_input_path else None,
+                        scale=scale_value,
+                        model=model_name,
+                        webhook=True,
+                        **upscale_options,
                     )
-                    time.sleep(delay)
-                    delay *= 2
-                    continue
-                logger.error("Upscale job {} submit failed after {} attempts: {}", job_id, attempts, exc)
-
-                # Determine error message based on error type
-                if isinstance(exc, httpx.HTTPStatusError):
-                    status_code = exc.response.status_code
-                    if status_code == 500:
-                        error_msg = (
-                            "Сервер временно недоступен (ошибка 500). "
-                            "Это проблема на стороне сервиса fal.ai. "
-                            "Попробуйте повторить запрос через несколько минут."
-                        )
-                    elif status_code == 422:
-                        error_msg = (
-                            "Некорректные параметры запроса (ошибка 422). "
-                            "Проверьте, что загружено корректное изображение."
+                    logger.info("Upscale job {} submitted to queue with task_id: {} (model: {})", job_id, task_id, model_name)
+                    if job:
+                        # Единственная промежуточная запись meta - task_id нужен для диагностики зависших задач
+                        job.meta["task_id"] = task_id
+                        job.save_meta()
+                    break
+                except Exception as exc:  # noqa: BLE001
+                    last_error = exc
+                    attempts += 1
+                    logger.opt(lazy=True).info("Upscale job {} submit attempt {} caught exception: {} ({})",
+                                               lambda: job_id, lambda: attempts, lambda: type(exc).__name__, lambda: exc)
+                    is_retryable = _is_retryable_error(exc)
+                    logger.info("Upscale job {} submit attempt {}: is_retryable={}, attempts_left={}", 
+                               job_id, attempts, is_retryable, UPSCALE_MAX_ATTEMPTS - attempts)
+                    if is_retryable and attempts < UPSCALE_MAX_ATTEMPTS:
+                        error_type = "network/server" if isinstance(exc, (httpx.RequestError, httpx.HTTPStatusError)) else "error"
+                        logger.warning(
+                            "Upscale job {} submit attempt {} failed due to {} issue: {}. Retrying in {:.1f}s",
+                            job_id,
+                            attempts,
+                            error_type,
+                            exc,
+                            delay,
                         )
-                    elif status_code == 429:
+                        time.sleep(delay)
+                        delay = _next_backoff(delay, base=UPSCALE_RETRY_BASE_DELAY, cap=SUBMIT_RETRY_MAX_DELAY)
+                        continue
+                    logger.error("Upscale job {} submit failed after {} attempts: {}", job_id, attempts, exc)
+
+                    # Determine error message based on error type
+                    if isinstance(exc, httpx.HTTPStatusError):
+                        status_code = exc.response.status_code
+                        if status_code == 500:
+                            error_msg = (
+                                "Сервер временно недоступен (ошибка 500). "
+                                "Это проблема на стороне сервиса fal.ai. "
+                                "Попробуйте повторить запрос через несколько минут."
+                            )
+                        elif status_code == 422:
+                            error_msg = (
+                                "Некорректные параметры запроса (ошибка 422). "
+                                "Проверьте, что загружено корректное изображение."
+                            )
+                        elif status_code == 429:
+                            error_msg = (
+                                "Превышен лимит запросов (ошибка 429). "
+                                "Подождите немного и попробуйте снова."
+                            )
+                        else:
+                            error_msg = f"Ошибка API (код {status_code}). Попробуйте позже."
+                    elif isinstance(exc, httpx.RequestError):
                         error_msg = (
-                            "Превышен лимит запросов (ошибка 429). "
-                            "Подождите немного и попробуйте снова."
+                            "Проблема с сетью при обращении к API. "
+                            "Проверьте подключение к интернету и попробуйте снова."
                         )
                     else:
-                        error_msg = f"Ошибка API (код {status_code}). Попробуйте позже."
-                elif isinstance(exc, httpx.RequestError):
-                    error_msg = (
-                        "Проблема с сетью при обращении к API. "
-                        "Проверьте подключение к интернету и попробуйте снова."
-                    )
-                else:
-                    error_msg = f"Не удалось отправить запрос на улучшение изображения: {str(exc)}. Попробуйте позже."
-
-                if job:
-                    job.meta["error"] = str(exc)
-                    job.meta["error_message"] = error_msg
-                    job.save_meta()
-                if notify_options.get("chat_id"):
-                    _send_failure_notification_sync(
-                        notify_options,
-                        job_id,
-                        error_msg,
-                    )
-                raise
-
-        if task_id is None:
-            error = last_error or RuntimeError("Upscale task submission failed")
-            if job:
-                job.meta["error"] = str(error)
-                job.save_meta()
-            if notify_options.get("chat_id"):
-                _send_failure_notification_sync(notify_options, job_id, str(error))
-            raise RuntimeError(str(error))
-
-        # Cleanup temporary input files before polling (they're no longer needed)
-        for tmp in cleanup_paths:
-            try:
-                tmp.unlink(missing_ok=True)
-            except OSError:
-                logger.debug("Failed to remove temporary file {} after upscale job {}", tmp, job_id)
+                        error_msg = f"Не удалось отправить запрос на улучшение изображения: {str(exc)}. Попробуйте позже."
 
-        # Poll for completion using queue API
-        logger.info("Upscale job {} polling for task {} completion", job_id, task_id)
-        status = check_image_status(task_id)
-        poll_attempts = 0
+                    if job:
+                        job.meta["error"] = str(exc)
+                        job.meta["error_message"] = error_msg
+                    if notify_options.get("chat_id"):
+                        _send_failure_notification_sync(
+                            notify_options,
+                            job_id,
+                            error_msg,
+                        )
+                    raise
 
-        while status["status"] not in ("succeeded", "failed"):
-            if poll_attempts >= UPSCALE_POLL_MAX_ATTEMPTS:
-                error = "Upscale task timed out after polling"
-                logger.error("Upscale job {} task {} timed out", job_id, task_id)
+            if task_id is None:
+                error = last_error or RuntimeError("Upscale task submission failed")
                 if job:
-                    job.meta["error"] = error
-                    job.save_meta()
+                    job.meta["error"] = str(error)
                 if notify_options.get("chat_id"):
-                    _send_failure_notification_sync(notify_options, job_id, "Задача превысила время ожидания. Попробуйте позже.")
-                raise RuntimeError(error)
+                    _send_failure_notification_sync(notify_options, job_id, str(error))
+                raise RuntimeError(str(error))
 
-            poll_attempts += 1
-            time.sleep(5)  # Poll every 5 seconds
-            status = check_image_status(task_id)
-            logger.debug("Upscale job {} task {} status: {}", job_id, task_id, status["status"])
+            # Poll for completion using queue API: общий asyncio-поллер (webhook fal.ai, бюджет по времени)
+            logger.info("Upscale job {} polling for task {} completion", job_id, task_id)
+            status, poll_attempts = _poll_task_status(
+                task_id,
+                interval=UPSCALE_POLL_INITIAL_INTERVAL,
+                timeout=UPSCALE_POLL_TIMEOUT,
+                max_interval=UPSCALE_POLL_INTERVAL,
+                log_prefix=f"Upscale job {job_id}",
+            )
 
             if status["status"] == "failed":
                 error = status.get("error", "Unknown error")
                 logger.error("Upscale job {} task {} failed: {}", job_id, task_id, error)
                 if job:
                     job.meta["error"] = error
-                    job.save_meta()
                 if notify_options.get("chat_id"):
                     _send_failure_notification_sync(notify_options, job_id, f"Улучшение изображения не удалось: {error}")
-                # Mark operation as failed on error
-                if operation_id:
-                    db = SessionLocal()
-                    try:
-                        BillingService.fail_operation(db, operation_id)
-                        logger.info("Marked operation {} as failed for upscale job {} due to error", operation_id, job_id)
-                    except Exception as fail_error:
-                        logger.error("Error failing operation {} for upscale job {}: {}", operation_id, job_id, fail_error, exc_info=True)
-                    finally:
-                        db.close()
+                # Операция помечается неуспешной во внешнем except
                 raise RuntimeError(error)
-
-        # After the while loop, status is either "succeeded" or "failed"
-        # According to fal.ai docs, when status is COMPLETED, the result may be in the status response itself
-        # or available via response_url. Let's check if result is already in status first.
-        from app.providers.fal.images import _extract_image_url as extract_image_url
-        status_image_url = extract_image_url(status)
-        logger.debug("Upscale job {} extracted URL from status: {}", job_id, status_image_url[:100] if status_image_url else "None")
-        asset = None
-
-        if status_image_url:
-            # Check if this is a queue API endpoint (response_url) or a real image URL
-            if status_image_url.startswith("https://queue.fal.run") or status_image_url.startswith("http://queue.fal.run"):
-                # This is a queue API endpoint, not a direct image URL - skip it
-                logger.info("Upscale job {} found response_url in status (not a direct image URL), will use resolve_image_asset", job_id)
-                status_image_url = None
-                asset = None  # Ensure asset is None so we use resolve_image_asset
-            elif status_image_url.startswith("data:"):
-                logger.info("Upscale job {} result found in status response (data URL)", job_id)
-                # Result is already in status as data URL, extract it directly
-                from app.providers.fal.images import ImageAsset
-                import base64
-                header, _, data_part = status_image_url.partition(",")
-                content = base64.b64decode(data_part)
-                asset = ImageAsset(url=None, content=content, filename="upscale.png")
-            elif status_image_url.startswith("http"):
-                # This looks like a direct image URL (CDN, etc.)
-                logger.info("Upscale job {} result found in status response (direct URL): {}", job_id, status_image_url[:100])
-                from app.providers.fal.images import ImageAsset
-                asset = ImageAsset(url=status_image_url, content=None, filename=None)
-            else:
-                logger.warning("Upscale job {} unexpected image URL format in status: {}", job_id, status_image_url[:100])
-
-        # If result not in status, try to get it via response_url with retries
-        if asset is None:
-            result_url = status.get("result_url")
-            if not result_url:
-                error = "Upscale task completed but no result URL provided and no result in status"
-                logger.error("Upscale job {} task {} completed without result URL or result in status", job_id, task_id)
+            if status["status"] != "succeeded":
+                error = "Upscale task timed out after polling"
+                logger.error("Upscale job {} task {} timed out after {} attempts", job_id, task_id, poll_attempts)
                 if job:
                     job.meta["error"] = error
-                    job.save_meta()
                 if notify_options.get("chat_id"):
-                    _send_failure_notification_sync(notify_options, job_id, "Задача завершена, но результат недоступен.")
+                    _send_failure_notification_sync(notify_options, job_id, "Задача превысила время ожидания. Попробуйте позже.")
                 raise RuntimeError(error)
 
-            # Small delay after completion to allow API to prepare the result
-            # Sometimes the API returns 500 immediately after COMPLETED status
-            logger.debug("Upscale job {} task {} completed, waiting 1s before fetching result", job_id, task_id)
-            time.sleep(1.0)
+            # Here status is "succeeded"
+            # According to fal.ai docs, when status is COMPLETED, the result may be in the status response itself
+            # or available via response_url. Let's check if result is already in status first.
+            status_image_url = _extract_image_url(status)
+            logger.opt(lazy=True).debug("Upscale job {} extracted URL from status: {}", lambda: job_id,
+                                        lambda: status_image_url[:100] if status_image_url else "None")
+            asset = None
 
-            # Try to get result with retries and increasing delays
-            # Use resolve_image_asset which properly handles authorization and retries
-            max_result_attempts = 5
-            result_delay = 1.0
-            last_result_error: Exception | None = None
-            api_file_size: int | None = None  # Store file_size from API response
+            if status_image_url:
+                # Check if this is a queue API endpoint (response_url) or a real image URL
+                url_kind = _result_url_kind(status_image_url)
+                if url_kind == "queue":
+                    # This is a queue API endpoint, not a direct image URL - skip it
+                    logger.info("Upscale job {} found response_url in status (not a direct image URL), will use resolve_image_asset", job_id)
+                    status_image_url = None
+                    asset = None  # Ensure asset is None so we use resolve_image_asset
+                elif url_kind == "data":
+                    logger.info("Upscale job {} result found in status response (data URL)", job_id)
+                    # Result is already in status as data URL, extract it directly
+                    content = _decode_data_url(status_image_url)
+                    asset = ImageAsset(url=None, content=content, filename="upscale.png")
+                elif url_kind == "http":
+                    # This looks like a direct image URL (CDN, etc.)
+                    logger.info("Upscale job {} result found in status response (direct URL): {}", job_id, status_image_url[:100])
+                    asset = ImageAsset(url=status_image_url, content=None, filename=None)
+                else:
+                    logger.warning("Upscale job {} unexpected image URL format in status: {}", job_id, status_image_url[:100])
 
-            for result_attempt in range(max_result_attempts):
-                try:
-                    logger.debug("Upscale job {} attempt {} to get result from {}", job_id, result_attempt + 1, result_url)
-
-                    # Try to extract file_size from API response before calling resolve_image_asset
-                    from app.providers.fal.images import _parse_result_url
-                    from app.providers.fal.client import queue_result
-                    parsed = _parse_result_url(result_url)
-                    if parsed:
-                        model_path, request_id = parsed
-                        try:
-                            response_data = queue_result(model_path, request_id)
-                            if isinstance(response_data, dict):
-                                # Check common structures: {'image': {'file_size': ...}} or {'file_size': ...}
-                                if 'image' in response_data and isinstance(response_data['image'], dict):
-                                    extracted_size = response_data['image'].get('file_size')
-                                    if extracted_size:
-                                        api_file_size = extracted_size
-                                        logger.info("Upscale job {}: extracted file_size {} bytes ({:.2f}MB) from API response", 
-                                                   job_id, api_file_size, api_file_size / (1024 * 1024))
-                                elif 'file_size' in response_data:
-                                    extracted_size = response_data.get('file_size')
-                                    if extracted_size:
-                                        api_file_size = extracted_size
-                                        logger.info("Upscale job {}: extracted file_size {} bytes ({:.2f}MB) from API response", 
-                                                   job_id, api_file_size, api_file_size / (1024 * 1024))
-                        except Exception as size_extract_exc:  # noqa: BLE001
-                            logger.debug("Upscale job {}: could not extract file_size from API response: {}", job_id, size_extract_exc)
+            # If result not in status, try to get it via response_url with retries
+            if asset is None:
+                result_url = status.get("result_url")
+                if not result_url:
+                    error = "Upscale task completed but no result URL provided and no result in status"
+                    logger.error("Upscale job {} task {} completed without result URL or result in status", job_id, task_id)
+                    if job:
+                        job.meta["error"] = error
+                    if notify_options.get("chat_id"):
+                        _send_failure_notification_sync(notify_options, job_id, "Задача завершена, но результат недоступен.")
+                    raise RuntimeError(error)
 
-                    # Use resolve_image_asset which properly handles queue API authorization
-                    asset = resolve_image_asset(result_url)
-                    logger.info("Upscale job {} successfully got result on attempt {}: asset.url={}, asset.content={}", 
-                               job_id, result_attempt + 1, asset.url[:100] if asset.url else "None", asset.content is not None)
-                    # Check if asset.url is a queue API endpoint - if so, we need to get the actual image URL
-                    if asset.url and (asset.url.startswith("https://queue.fal.run") or asset.url.startswith("http://queue.fal.run")):
-                        logger.warning("Upscale job {} asset.url is a queue API endpoint, this should not happen. asset.url={}", 
-                                      job_id, asset.url)
-                        # Try to get the actual result from queue_result
-                        from app.providers.fal.client import queue_result
-                        from app.providers.fal.images import _extract_image_url, ImageAsset, _parse_result_url
-                        parsed = _parse_result_url(result_url)
-                        if parsed:
-                            model_path, request_id = parsed
-                            logger.info("Upscale job {} trying queue_result directly for model={}, request_id={}", 
-                                       job_id, model_path, request_id)
-                            response_data = queue_result(model_path, request_id)
-                            logger.info("Upscale job {} queue_result response keys: {}", job_id, list(response_data.keys()) if isinstance(response_data, dict) else "not a dict")
-                            actual_image_url = _extract_image_url(response_data)
-                            # Try to extract file_size from response_data
-                            if isinstance(response_data, dict):
-                                # Check common structures: {'image': {'file_size': ...}} or {'file_size': ...}
-                                if 'image' in response_data and isinstance(response_data['image'], dict):
-                                    api_file_size = response_data['image'].get('file_size')
-                                elif 'file_size' in response_data:
-                                    api_file_size = response_data['file_size']
-                                if api_file_size:
-                                    logger.info("Upscale job {}: extracted file_size {} bytes ({:.2f}MB) from API response", 
-                                               job_id, api_file_size, api_file_size / (1024 * 1024))
-                            if actual_image_url and not (actual_image_url.startswith("https://queue.fal.run") or actual_image_url.startswith("http://queue.fal.run")):
-                                logger.info("Upscale job {} extracted actual image URL: {}", job_id, actual_image_url[:100])
-                                asset = ImageAsset(url=actual_image_url, content=None, filename=None)
+                # Забираем результат сразу после COMPLETED; если API еще отдает 404/5xx,
+                # повторяем с jitter-backoff от RESULT_FIRST_RETRY_DELAY вместо фиксированной паузы в 1 с
+                max_result_attempts = 5
+                result_delay = RESULT_FIRST_RETRY_DELAY
+                last_result_error: Exception | None = None
+
+                for result_attempt in range(max_result_attempts):
+                    try:
+                        logger.debug("Upscale job {} attempt {} to get result from {}", job_id, result_attempt + 1, result_url)
+
+                        # file_size и прямой URL берутся из одного ответа queue_result
+                        asset = _fetch_upscale_result(result_url, job_id)
+                        logger.opt(lazy=True).info("Upscale job {} successfully got result on attempt {}: asset.url={}, asset.content={}", 
+                                   lambda: job_id, lambda: result_attempt + 1, lambda: asset.url[:100] if asset.url else "None", lambda: asset.content is not None)
+                        break
+                    except Exception as exc:  # noqa: BLE001
+                        last_result_error = exc
+                        # Check if it's an HTTP error that we can retry
+                        if isinstance(exc, httpx.HTTPStatusError):
+                            status_code = exc.response.status_code
+                            if status_code in RESULT_RETRYABLE_STATUSES and result_attempt < max_result_attempts - 1:
+                                # Тело ответа материализуется только если уровень WARNING включен
+                                logger.opt(lazy=True).warning(
+                                    "Upscale job {} result attempt {} failed with {}: {}. Retrying in {:.1f}s",
+                                    lambda: job_id,
+                                    lambda: result_attempt + 1,
+                                    lambda: status_code,
+                                    lambda: exc.response.text[:100] if hasattr(exc.response, 'text') else str(exc),
+                                    lambda: result_delay,
+                                )
+                                time.sleep(result_delay)
+                                result_delay = _next_backoff(result_delay, base=RESULT_FIRST_RETRY_DELAY)
+                                continue
                             else:
-                                logger.error("Upscale job {} failed to extract valid image URL from queue_result response", job_id)
-                    break
-                except Exception as exc:  # noqa: BLE001
-                    last_result_error = exc
-                    # Check if it's an HTTP error that we can retry
-                    if isinstance(exc, httpx.HTTPStatusError):
-                        status_code = exc.response.status_code
-                        if status_code in (500, 502, 503, 401) and result_attempt < max_result_attempts - 1:
-                            logger.warning(
-                                "Upscale job {} result attempt {} failed with {}: {}. Retrying in {:.1f}s",
-                                job_id,
-                                result_attempt + 1,
-                                status_code,
-                                exc.response.text[:100] if hasattr(exc.response, 'text') else str(exc),
-                                result_delay,
-                            )
-                            time.sleep(result_delay)
-                            result_delay *= 1.5
-                            continue
+                                logger.error("Upscale job {} result attempt {} failed with {}: {}", job_id, result_attempt + 1, status_code, exc)
+                                raise
                         else:
-                            logger.error("Upscale job {} result attempt {} failed with {}: {}", job_id, result_attempt + 1, status_code, exc)
-                            raise
-                    else:
-                        logger.error("Upscale job {} result attempt {} failed: {}", job_id, result_attempt + 1, exc)
-                        if result_attempt >= max_result_attempts - 1:
-                            raise
+                            logger.error("Upscale job {} result attempt {} failed: {}", job_id, result_attempt + 1, exc)
+                            if result_attempt >= max_result_attempts - 1:
+                                raise
 
-        if asset is None:
-            error_msg = str(last_result_error) if last_result_error else "Failed to get upscale result"
-            logger.error("Upscale job {} failed to get result after {} attempts: {}", job_id, max_result_attempts, error_msg)
-            if job:
-                job.meta["error"] = error_msg
-                job.save_meta()
-            if notify_options.get("chat_id"):
-                _send_failure_notification_sync(notify_options, job_id, f"Не удалось получить результат: {error_msg}")
-            # Mark operation as failed
-            if operation_id:
-                db = SessionLocal()
+            if asset is None:
+                error_msg = str(last_result_error) if last_result_error else "Failed to get upscale result"
+                logger.error("Upscale job {} failed to get result after {} attempts: {}", job_id, max_result_attempts, error_msg)
+                if job:
+                    job.meta["error"] = error_msg
+                if notify_options.get("chat_id"):
+                    _send_failure_notification_sync(notify_options, job_id, f"Не удалось получить результат: {error_msg}")
+                # Операция помечается неуспешной во внешнем except
+                raise RuntimeError(error_msg)
+
+            if cache_key and asset is not None and asset.url and _result_url_kind(asset.url) == "http":
                 try:
-                    BillingService.fail_operation(db, operation_id)
-                    logger.info("Marked operation {} as failed for upscale job {} due to error", operation_id, job_id)
-                except Exception as fail_error:
-                    logger.error("Error failing operation {} for upscale job {}: {}", operation_id, job_id, fail_error, exc_info=True)
-                finally:
-                    db.close()
-            raise RuntimeError(error_msg)
+                    store_cached_upscale(cache_key, asset.url, asset.filename)
+                except Exception as cache_exc:  # noqa: BLE001
+                    logger.warning("Upscale job {}: failed to cache result: {}", job_id, cache_exc)
 
         if asset is None:
             raise RuntimeError("fal upscale did not return an asset")
@@ -3345,18 +3398,11 @@ def process_image_upscale_job(
             logger.debug("Scheduled background download for upscale result: {} -> {}", asset.url, output_file)
 
         caption_url = asset.url
+        # С skip_download=True файл пишется только из asset.content, поэтому повторно читать saved_path
+        # с диска не нужно: байты уже в памяти, а URL-результат Telegram скачивает сам
         image_bytes = asset.content
         filename = asset.filename
 
-        # If no image_bytes but saved_path exists, read file (for fallback)
-        if image_bytes is None and saved_path and saved_path.exists():
-            try:
-                image_bytes = saved_path.read_bytes()
-                filename = filename or saved_path.name
-                logger.debug("Read upscale result from file: {} ({} bytes)", saved_path, len(image_bytes))
-            except Exception as read_exc:  # noqa: BLE001
-                logger.warning("Failed to read saved upscale result {}: {}", saved_path, read_exc)
-
         if job:
             if asset.url:
                 job.meta["image_url"] = asset.url
@@ -3404,44 +3450,29 @@ def process_image_upscale_job(
                 logger.error("Failed to send Telegram notification for upscale job {}: {}", job_id, notify_error, exc_info=True)
 
         # Confirm operation after successful completion
-        if operation_id:
-            db = SessionLocal()
-            try:
-                success = BillingService.confirm_operation(db, operation_id)
-                if success:
-                    logger.info("Confirmed operation {} for upscale job {}", operation_id, job_id)
-                else:
-                    logger.error("Failed to confirm operation {} for upscale job {}", operation_id, job_id)
-            except Exception as e:
-                logger.error("Error confirming operation {} for upscale job {}: {}", operation_id, job_id, e, exc_info=True)
-            finally:
-                db.close()
+        _billing_confirm(operation_id, job_id, "upscale job")
 
         return caption_url or ""
     except JobTimeoutException as timeout_exc:
         # Обработка таймаута задачи - отправляем уведомление пользователю
         logger.error("Upscale job {} timed out after 4 minutes", job_id)
         _handle_job_timeout(job_id, notify_options, "улучшения качества")
+        if job:
+            job.meta["error"] = "timeout"
+            job.save_meta()
         # Mark operation as failed
-        if operation_id:
-            db = SessionLocal()
-            try:
-                BillingService.fail_operation(db, operation_id)
-                logger.info("Marked operation {} as failed for upscale job {} due to timeout", operation_id, job_id)
-            except Exception as fail_error:
-                logger.error("Error failing operation {} for upscale job {}: {}", operation_id, job_id, fail_error, exc_info=True)
-            finally:
-                db.close()
+        _billing_fail(operation_id, job_id, "upscale job", "timeout")
         raise
     except Exception as e:
+        if job:
+            job.meta.setdefault("error", str(e))
+            job.save_meta()
         # Mark operation as failed on any error
-        if operation_id:
-            db = SessionLocal()
+        _billing_fail(operation_id, job_id, "upscale job")
+        raise
+    finally:
+        for tmp in cleanup_paths:
             try:
-                BillingService.fail_operation(db, operation_id)
-                logger.info("Marked operation {} as failed for upscale job {} due to error", operation_id, job_id)
-            except Exception as fail_error:
-                logger.error("Error failing operation {} for upscale job {}: {}", operation_id, job_id, fail_error, exc_info=True)
-            finally:
-                db.close()
-        raise
\ No newline at end of file
+                tmp.unlink(missing_ok=True)
+            except OSError:
+                logger.debug("Failed to remove temporary file {} after upscale job {}", tmp, job_id)
\ No newline at end of file